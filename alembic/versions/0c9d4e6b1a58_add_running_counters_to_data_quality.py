@@ -0,0 +1,31 @@
+"""add running counters to data quality
+
+Revision ID: 0c9d4e6b1a58
+Revises: e5c2a9f07d31
+Create Date: 2026-10-17 19:36:12.847203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0c9d4e6b1a58"
+down_revision: Union[str, None] = "e5c2a9f07d31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("data_quality", sa.Column("valid_records", sa.BigInteger()))
+    op.add_column("data_quality", sa.Column("unique_records", sa.BigInteger()))
+    op.add_column("data_quality", sa.Column("sketch", sa.LargeBinary()))
+
+
+def downgrade() -> None:
+    op.drop_column("data_quality", "sketch")
+    op.drop_column("data_quality", "unique_records")
+    op.drop_column("data_quality", "valid_records")
@@ -0,0 +1,25 @@
+"""add cancelled to task status
+
+Revision ID: 2d7c91f4b6e3
+Revises: 9b5e07c3d2f8
+Create Date: 2026-10-17 16:02:19.447361
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2d7c91f4b6e3"
+down_revision: Union[str, None] = "9b5e07c3d2f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE task_status ADD VALUE 'CANCELLED'")
+
+
+def downgrade() -> None:
+    pass
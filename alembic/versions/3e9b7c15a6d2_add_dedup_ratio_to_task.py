@@ -0,0 +1,27 @@
+"""add dedup ratio to task
+
+Revision ID: 3e9b7c15a6d2
+Revises: 8c41d2a7f0b3
+Create Date: 2026-10-17 11:03:18.220417
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3e9b7c15a6d2"
+down_revision: Union[str, None] = "8c41d2a7f0b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("dedup_ratio", sa.Float()))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "dedup_ratio")
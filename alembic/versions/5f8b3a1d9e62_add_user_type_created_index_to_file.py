@@ -0,0 +1,27 @@
+"""add user type created index to file
+
+Revision ID: 5f8b3a1d9e62
+Revises: 0c9d4e6b1a58
+Create Date: 2026-10-17 20:14:55.618390
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f8b3a1d9e62"
+down_revision: Union[str, None] = "0c9d4e6b1a58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_files_user_type_created", "files", ["user_id", "type", "created"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_user_type_created", table_name="files")
@@ -0,0 +1,52 @@
+"""add job queue columns to task
+
+Revision ID: 6d0f3a8e21c4
+Revises: a57d0e2c9b41
+Create Date: 2026-10-17 13:22:07.318452
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6d0f3a8e21c4"
+down_revision: Union[str, None] = "a57d0e2c9b41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tasks",
+        sa.Column(
+            "master_file_id",
+            sa.Uuid(as_uuid=False),
+            sa.ForeignKey("files.id", ondelete="SET NULL"),
+        ),
+    )
+    op.add_column("tasks", sa.Column("params", sa.JSON()))
+    op.add_column("tasks", sa.Column("worker_id", sa.String(200)))
+    op.add_column("tasks", sa.Column("heartbeat", sa.DateTime(timezone=True)))
+    op.add_column(
+        "tasks",
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index(
+        "ix_tasks_pending",
+        "tasks",
+        ["started"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_pending", table_name="tasks")
+    op.drop_column("tasks", "attempts")
+    op.drop_column("tasks", "heartbeat")
+    op.drop_column("tasks", "worker_id")
+    op.drop_column("tasks", "params")
+    op.drop_column("tasks", "master_file_id")
@@ -0,0 +1,27 @@
+"""add claimed to task
+
+Revision ID: 7e3a5c0b8d14
+Revises: 2d7c91f4b6e3
+Create Date: 2026-10-17 16:44:58.260915
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7e3a5c0b8d14"
+down_revision: Union[str, None] = "2d7c91f4b6e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("claimed", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "claimed")
@@ -0,0 +1,27 @@
+"""add candidates pruned to task
+
+Revision ID: 8c41d2a7f0b3
+Revises: 2f7250dcee53
+Create Date: 2026-10-17 09:12:41.513208
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c41d2a7f0b3"
+down_revision: Union[str, None] = "2f7250dcee53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("candidates_pruned", sa.BigInteger()))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "candidates_pruned")
@@ -0,0 +1,56 @@
+"""add task events trigger
+
+Revision ID: 9b5e07c3d2f8
+Revises: f48b2d6c9a17
+Create Date: 2026-10-17 15:31:46.118093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b5e07c3d2f8"
+down_revision: Union[str, None] = "f48b2d6c9a17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE FUNCTION notify_task_event() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' OR (OLD.status, OLD.file_id, OLD.rows_processed)
+                IS DISTINCT FROM (NEW.status, NEW.file_id, NEW.rows_processed) THEN
+                PERFORM pg_notify('task_events', json_build_object(
+                    'id', NEW.id,
+                    'user_id', NEW.user_id,
+                    'file_id', NEW.file_id,
+                    'status', NEW.status,
+                    'started', NEW.started,
+                    'ended', NEW.ended,
+                    'rows_processed', NEW.rows_processed,
+                    'rows_total', NEW.rows_total,
+                    'rows_per_second', NEW.rows_per_second,
+                    'eta', NEW.eta
+                )::text);
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_notify AFTER INSERT OR UPDATE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION notify_task_event()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER tasks_notify ON tasks")
+    op.execute("DROP FUNCTION notify_task_event()")
@@ -0,0 +1,32 @@
+"""add active index to task
+
+Revision ID: a3d6e9f2c417
+Revises: 5f8b3a1d9e62
+Create Date: 2026-10-17 21:06:12.482915
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d6e9f2c417"
+down_revision: Union[str, None] = "5f8b3a1d9e62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tasks_active",
+        "tasks",
+        ["user_id", "status", "claimed"],
+        postgresql_where=sa.text("status IN ('PENDING', 'IN_PROGRESS')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_active", table_name="tasks")
@@ -0,0 +1,31 @@
+"""add stage hits to task
+
+Revision ID: a57d0e2c9b41
+Revises: 3e9b7c15a6d2
+Create Date: 2026-10-17 12:40:52.671903
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a57d0e2c9b41"
+down_revision: Union[str, None] = "3e9b7c15a6d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("exact_hits", sa.BigInteger()))
+    op.add_column("tasks", sa.Column("normalized_hits", sa.BigInteger()))
+    op.add_column("tasks", sa.Column("fuzzy_hits", sa.BigInteger()))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "fuzzy_hits")
+    op.drop_column("tasks", "normalized_hits")
+    op.drop_column("tasks", "exact_hits")
@@ -0,0 +1,54 @@
+"""add file column profiles
+
+Revision ID: b81e3d5a7c26
+Revises: 4a6f1c8e2b97
+Create Date: 2026-10-17 18:21:07.339852
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b81e3d5a7c26"
+down_revision: Union[str, None] = "4a6f1c8e2b97"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "file_column_profiles",
+        sa.Column("file_id", sa.Uuid(as_uuid=False), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("type", sa.String(length=20)),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("nulls", sa.BigInteger(), nullable=False),
+        sa.Column("null_rate", sa.Float(), nullable=False),
+        sa.Column("cardinality", sa.BigInteger(), nullable=False),
+        sa.Column("min_length", sa.Integer()),
+        sa.Column("max_length", sa.Integer()),
+        sa.Column("top_values", sa.JSON(), nullable=False),
+        sa.Column(
+            "created",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "modified",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("file_id", "position"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("file_column_profiles")
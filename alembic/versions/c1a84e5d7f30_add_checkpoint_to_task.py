@@ -0,0 +1,27 @@
+"""add checkpoint to task
+
+Revision ID: c1a84e5d7f30
+Revises: 6d0f3a8e21c4
+Create Date: 2026-10-17 14:05:33.904127
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c1a84e5d7f30"
+down_revision: Union[str, None] = "6d0f3a8e21c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("checkpoint", sa.JSON()))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "checkpoint")
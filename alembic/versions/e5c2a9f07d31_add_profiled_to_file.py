@@ -0,0 +1,43 @@
+"""add profiled to file
+
+Revision ID: e5c2a9f07d31
+Revises: b81e3d5a7c26
+Create Date: 2026-10-17 18:58:43.120475
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5c2a9f07d31"
+down_revision: Union[str, None] = "b81e3d5a7c26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("profiled", sa.DateTime(timezone=True)))
+    op.add_column("files", sa.Column("ingest_claimed", sa.DateTime(timezone=True)))
+    op.add_column(
+        "files",
+        sa.Column("ingest_attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+    # Existing files were profiled, if ever, through PATCH /files/{file_id}.
+    op.execute("UPDATE files SET profiled = modified")
+    op.create_index(
+        "ix_files_unprofiled",
+        "files",
+        ["created"],
+        postgresql_where=sa.text("profiled IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_unprofiled", table_name="files")
+    op.drop_column("files", "ingest_attempts")
+    op.drop_column("files", "ingest_claimed")
+    op.drop_column("files", "profiled")
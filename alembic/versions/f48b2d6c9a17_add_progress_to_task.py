@@ -0,0 +1,33 @@
+"""add progress to task
+
+Revision ID: f48b2d6c9a17
+Revises: c1a84e5d7f30
+Create Date: 2026-10-17 14:48:12.530716
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f48b2d6c9a17"
+down_revision: Union[str, None] = "c1a84e5d7f30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("rows_processed", sa.BigInteger()))
+    op.add_column("tasks", sa.Column("rows_total", sa.BigInteger()))
+    op.add_column("tasks", sa.Column("rows_per_second", sa.Float()))
+    op.add_column("tasks", sa.Column("eta", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "eta")
+    op.drop_column("tasks", "rows_per_second")
+    op.drop_column("tasks", "rows_total")
+    op.drop_column("tasks", "rows_processed")
@@ -13,11 +13,52 @@ class Settings(BaseSettings):
     aws_access_key_id: str
     aws_access_key: str
     aws_storage_bucket_name: str
+    aws_endpoint_url: str | None = None
+    storage_max_connections: int = 20
+    columns_sample_bytes: int = 64 * 1024
+    profile_top_values: int = 10
+    dashboard_ttl_seconds: float = 60.0
 
     secret: str
 
     origin: list
 
+    match_chunk_size: int = 64
+    match_candidates: int = 0
+    match_ngram: int = 3
+    match_verify_rows: int = 0
+    match_workers: int | None = None
+    match_rows_per_chunk: int = 2048
+    match_stream_rows: int = 50_000
+    match_memo_size: int = 1_000_000
+
+    index_cache_dir: str = ".cache/index"
+    index_cache_max_bytes: int = 2 * 1024**3
+
+    object_cache_dir: str = ".cache/objects"
+    object_cache_max_bytes: int = 2 * 1024**3
+    object_cache_fresh_seconds: float = 0.0
+
+    worker_poll_seconds: float = 2.0
+    worker_heartbeat_seconds: float = 10.0
+    worker_stale_seconds: float = 60.0
+    worker_max_attempts: int = 3
+    worker_jobs: int = 1
+    embedded_worker: bool = False
+
+    ingest_poll_seconds: float = 10.0
+    ingest_window_seconds: float = 2 * 3600.0
+    ingest_prewarm_columns: int = 4
+    ingest_max_attempts: int = 3
+    ingest_lease_seconds: float = 3600.0
+
+    jobs_max_running: int | None = None
+    jobs_max_per_user: int = 2
+    progress_interval_seconds: float = 5.0
+
+    events_queue_size: int = 100
+    events_keepalive_seconds: float = 15.0
+
     model_config = SettingsConfigDict(env_file=".env")
 
 
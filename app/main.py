@@ -1,18 +1,20 @@
 import asyncio
 import logging
-from contextlib import asynccontextmanager
-from datetime import datetime
+from contextlib import asynccontextmanager, suppress
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from sqlalchemy import func, insert, or_, select
 
+from app import worker
 from app.config import get_settings
 from app.db import get_async_session
-from app.models.file import DataQuality, File
 from app.routers import auth, files, tasks, users
+from app.services import pool, quality
+from app.services.bucket import storage
+from app.services.dashboard import dashboard
+from app.services.events import events
 
 settings = get_settings()
 logger = logging.getLogger("scheduler")
@@ -23,59 +25,10 @@ class SchedulerService:
     async def check_dq():
         logger.info("running data quality sync")
         async with get_async_session() as session:
-            this_month = await session.scalar(
-                select(DataQuality).where(
-                    DataQuality.date == datetime.now().replace(day=1).date()
-                )
-            )
-
-            if not this_month:
-                unique = await session.scalar(
-                    select(func.sum(File.unique))
-                    .select_from(File)
-                    .where(or_(File.type == "QUERY", File.type == "MASTER"))
-                )
-
-                valid = await session.scalar(
-                    select(func.sum(File.valid))
-                    .select_from(File)
-                    .where(or_(File.type == "QUERY", File.type == "MASTER"))
-                )
-
-                total = await session.scalar(
-                    select(func.sum(File.total))
-                    .select_from(File)
-                    .where(or_(File.type == "QUERY", File.type == "MASTER"))
-                )
-
-                master = await session.scalar(
-                    select(func.sum(File.total))
-                    .select_from(File)
-                    .where(File.type == "MASTER")
-                )
-
-                query = await session.scalar(
-                    select(func.sum(File.total))
-                    .select_from(File)
-                    .where(File.type == "QUERY")
-                )
-
-                overall_uniqueness = unique / total
-                overall_completeness = valid / total
-
-                await session.scalar(
-                    insert(DataQuality)
-                    .values(
-                        date=datetime.now().replace(day=1).date(),
-                        overall_completeness=overall_completeness,
-                        overall_uniqueness=overall_uniqueness,
-                        total_query_records=query,
-                        total_master_records=master,
-                    )
-                    .returning(DataQuality)
-                )
-
-                await session.commit()
+            await quality.snapshot(session)
+            await session.commit()
+
+        dashboard.invalidate()
 
     def start(self):
         logger.info("Starting scheduler service.")
@@ -99,8 +52,20 @@ async def lifespan(app: FastAPI):
     sch_srv = SchedulerService()
     sch_srv.start()
 
+    embedded = asyncio.create_task(worker.run()) if settings.embedded_worker else None
+
     yield
 
+    if embedded is not None:
+        embedded.cancel()
+
+        with suppress(asyncio.CancelledError):
+            await embedded
+
+    await events.close()
+    await storage.close()
+    pool.shutdown()
+
 
 app = FastAPI(
     title="master data management api",
@@ -3,7 +3,22 @@ from datetime import datetime
 from typing import List
 
 from pydantic import BaseModel
-from sqlalchemy import Date, DateTime, Enum, Float, Integer, String, Uuid, func
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Uuid,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -23,6 +38,14 @@ class Type(Enum):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        Index(
+            "ix_files_unprofiled",
+            "created",
+            postgresql_where=text("profiled IS NULL"),
+        ),
+        Index("ix_files_user_type_created", "user_id", "type", "created"),
+    )
 
     id: Mapped[str] = mapped_column(
         Uuid(as_uuid=False), primary_key=True, default=lambda _: str(uuid.uuid4())
@@ -38,6 +61,51 @@ class File(Base):
     type: Mapped[Type] = mapped_column(
         Enum("MASTER", "QUERY", "RESULT", name="file_type"), nullable=False
     )
+    profiled: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    ingest_claimed: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    ingest_attempts: Mapped[int] = mapped_column(
+        Integer(), nullable=False, server_default="0"
+    )
+
+    def to_dict(self):
+        return {field.name: getattr(self, field.name) for field in self.__table__.c}
+
+
+class FileSketch(Base):
+    """HyperLogLog registers of the distinct values of a file's column, see
+    :class:`app.services.profiling.HyperLogLog`."""
+
+    __tablename__ = "file_sketches"
+
+    file_id: Mapped[str] = mapped_column(
+        Uuid(as_uuid=False),
+        ForeignKey("files.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    column: Mapped[str] = mapped_column(String(200), primary_key=True)
+    sketch: Mapped[bytes] = mapped_column(LargeBinary(), nullable=False)
+
+
+class FileColumnProfile(Base):
+    __tablename__ = "file_column_profiles"
+
+    file_id: Mapped[str] = mapped_column(
+        Uuid(as_uuid=False),
+        ForeignKey("files.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    position: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    type: Mapped[str | None] = mapped_column(String(20))
+    count: Mapped[int] = mapped_column(BigInteger(), nullable=False)
+    nulls: Mapped[int] = mapped_column(BigInteger(), nullable=False)
+    null_rate: Mapped[float] = mapped_column(Float(), nullable=False)
+    cardinality: Mapped[int] = mapped_column(BigInteger(), nullable=False)
+    min_length: Mapped[int | None] = mapped_column(Integer())
+    max_length: Mapped[int | None] = mapped_column(Integer())
+    top_values: Mapped[list] = mapped_column(JSON(), nullable=False)
 
     def to_dict(self):
         return {field.name: getattr(self, field.name) for field in self.__table__.c}
@@ -56,6 +124,9 @@ class DataQuality(DQBase):
     overall_completeness: Mapped[float] = mapped_column(Float())
     total_query_records: Mapped[int] = mapped_column(Integer())
     total_master_records: Mapped[int] = mapped_column(Integer())
+    valid_records: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    unique_records: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    sketch: Mapped[bytes] = mapped_column(LargeBinary(), nullable=True)
 
     def to_dict(self):
         return {field.name: getattr(self, field.name) for field in self.__table__.c}
@@ -82,6 +153,31 @@ class FileResponse(BaseModel):
     url: str
 
 
+class TopValue(BaseModel):
+    value: str
+    count: int
+    error: int
+
+
+class ColumnProfileResponse(BaseModel):
+    position: int
+    name: str
+    type: str | None
+    count: int
+    nulls: int
+    null_rate: float
+    cardinality: int
+    min_length: int | None
+    max_length: int | None
+    top_values: List[TopValue]
+
+
+class FileProfileResponse(BaseModel):
+    file_id: str
+    total: int
+    columns: List[ColumnProfileResponse]
+
+
 class FileStats(BaseModel):
     overall_completeness: str
     completeness_diff: str
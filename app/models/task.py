@@ -3,9 +3,24 @@ from datetime import datetime
 from typing import List
 
 from pydantic import BaseModel
-from sqlalchemy import DateTime, Enum, Uuid, func
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Uuid,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+from app.models.file import File
+
 
 class Base(DeclarativeBase):
     started: Mapped[datetime] = mapped_column(
@@ -20,10 +35,26 @@ class Type(Enum):
     PENDING = "PENDING"
     IN_PROGRESS = "IN_PROGRESS"
     COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index(
+            "ix_tasks_pending",
+            "started",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        Index(
+            "ix_tasks_active",
+            "user_id",
+            "status",
+            "claimed",
+            postgresql_where=text("status IN ('PENDING', 'IN_PROGRESS')"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(
         Uuid(as_uuid=False), primary_key=True, default=lambda _: str(uuid.uuid4())
@@ -33,9 +64,37 @@ class Task(Base):
         Uuid(as_uuid=False), nullable=False, unique=True
     )
     status: Mapped[Type] = mapped_column(
-        Enum("PENDING", "IN_PROGRESS", "COMPLETED", "FAILED", name="task_status"),
+        Enum(
+            "PENDING",
+            "IN_PROGRESS",
+            "COMPLETED",
+            "FAILED",
+            "CANCELLED",
+            name="task_status",
+        ),
         nullable=False,
     )
+    candidates_pruned: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    dedup_ratio: Mapped[float] = mapped_column(Float(), nullable=True)
+    exact_hits: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    normalized_hits: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    fuzzy_hits: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+
+    master_file_id: Mapped[str] = mapped_column(
+        Uuid(as_uuid=False),
+        ForeignKey(File.id, ondelete="SET NULL"),
+        nullable=True,
+    )
+    params: Mapped[dict] = mapped_column(JSON(), nullable=True)
+    worker_id: Mapped[str] = mapped_column(String(200), nullable=True)
+    heartbeat: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    claimed: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer(), nullable=False, server_default="0")
+    checkpoint: Mapped[dict] = mapped_column(JSON(), nullable=True)
+    rows_processed: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    rows_total: Mapped[int] = mapped_column(BigInteger(), nullable=True)
+    rows_per_second: Mapped[float] = mapped_column(Float(), nullable=True)
+    eta: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
 
     def to_dict(self):
         return {field.name: getattr(self, field.name) for field in self.__table__.c}
@@ -49,8 +108,18 @@ class TaskResponse(BaseModel):
     user_name: str
     status: str
     started: datetime
-    ended: datetime
+    ended: datetime | None = None
     url: str
+    candidates_pruned: int | None = None
+    dedup_ratio: float | None = None
+    exact_hits: int | None = None
+    normalized_hits: int | None = None
+    fuzzy_hits: int | None = None
+    rows_processed: int | None = None
+    rows_total: int | None = None
+    rows_per_second: float | None = None
+    eta: datetime | None = None
+    queue_position: int | None = None
 
 
 class TasksResponse(BaseModel):
@@ -1,69 +1,50 @@
-import io
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Annotated, Literal, Union
 from uuid import UUID
 
-import boto3
-import pandas as pd
-import requests
-from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, status
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, Response, status
 from sqlalchemy import delete, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from thefuzz import fuzz
 
 from app.config import get_settings
-from app.db import get_async_session, get_session
+from app.db import get_session
 from app.models.file import (
-    DataQuality,
     File,
+    FileColumnProfile,
+    FileProfileResponse,
     FileResponse,
+    FileSketch,
     FilesResponse,
     FileStats,
     GraphResponse,
 )
 from app.models.task import Task
 from app.models.user import User
+from app.services import index_cache, quality
 from app.services.auth import get_current_user
+from app.services.bucket import client, file_key, storage
+from app.services.dashboard import dashboard, etag
+from app.services.files import read_columns
+from app.services.ingest import profile_file
+from app.services.sidecar import sidecar_key
 
 router = APIRouter()
 settings = get_settings()
 
-aws_session = boto3.Session(
-    aws_access_key_id=settings.aws_access_key_id,
-    aws_secret_access_key=settings.aws_access_key,
-)
 
-s3 = aws_session.resource("s3")
-client = aws_session.client("s3")  # , endpoint_url="https://cdn.future-fdn.tech")
-bucket = s3.Bucket(settings.aws_storage_bucket_name)
-
-
-def read_file(file: File, is_csv=None) -> pd.DataFrame:
-    url = client.generate_presigned_url(
-        "get_object",
-        ExpiresIn=3600,
-        Params={
-            "Bucket": settings.aws_storage_bucket_name,
-            "Key": file.type.title() + "/" + file.file_name
-            if file.type.lower() != "result"
-            else file.type.lower() + "/" + file.file_name,
-        },
-    ).replace("s3.amazonaws.com/", "")
-
-    if file.file_name.endswith(".csv") or is_csv:
-        response = requests.get(url)
-
-        df = pd.read_csv(io.StringIO(response.content.decode("utf-8")))
-    elif file.file_name.endswith(".txt"):
-        response = requests.get(url)
-        df = pd.read_fwf(io.StringIO(response.content.decode("utf-8")), header=None)
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File type not supported",
-        )
+def cached_response(request: Request, response: Response, body: dict):
+    """Return ``body`` with an ETag, or an empty 304 if the client has it."""
+    tag = etag(body)
+
+    if request.headers.get("If-None-Match") == tag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+
+    response.headers["ETag"] = tag
+    response.headers["Cache-Control"] = (
+        f"private, max-age={int(settings.dashboard_ttl_seconds)}"
+    )
 
-    return df
+    return body
 
 
 @router.get(
@@ -72,6 +53,8 @@ def read_file(file: File, is_csv=None) -> pd.DataFrame:
 )
 async def get_specific_files(
     file_id: UUID | Literal["master", "query", "stats", "graph"],
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
     limit: int = 10,
@@ -81,12 +64,7 @@ async def get_specific_files(
     url = None
 
     if file_id == "stats":
-        date = datetime.now().replace(day=1).date()
-        date_minus_one = (datetime.now() - timedelta(days=datetime.now().day)).replace(
-            day=1
-        )
-
-        info = await session.scalar(select(DataQuality).where(DataQuality.date == date))
+        snapshot = await dashboard.get(session)
         query_count = await session.scalar(
             select(func.count())
             .select_from(File)
@@ -100,135 +78,16 @@ async def get_specific_files(
             )
         )
 
-        if not info:
-            info = await session.scalar(
-                select(DataQuality).where(
-                    DataQuality.date
-                    == (date_minus_one - timedelta(days=date_minus_one.day))
-                    .replace(day=1)
-                    .date()
-                )
-            )
-            if not info:
-                return_values = {
-                    "overall_uniqueness": format(0.0, "00.0f") + "%",
-                    "overall_completeness": format(0.0, "00.0f") + "%",
-                    "total_query_records": 0,
-                    "total_master_records": 0,
-                    "uniqueness_diff": format(
-                        0.0,
-                        "00.0f",
-                    )
-                    + "%",
-                    "completeness_diff": format(
-                        0.0,
-                        "00.0f",
-                    )
-                    + "%",
-                    "query_records_diff": 0,
-                    "master_records_diff": 0,
-                    "this_month_query_data": query_count,
-                }
-
-                return_values.update(
-                    {
-                        "uniqueness_diff": "+" + return_values["uniqueness_diff"]
-                        if not return_values["uniqueness_diff"].startswith("-")
-                        else return_values["uniqueness_diff"],
-                        "completeness_diff": "+" + return_values["completeness_diff"]
-                        if not return_values["uniqueness_diff"].startswith("-")
-                        else return_values["uniqueness_diff"],
-                    }
-                )
-
-                return return_values
-
-        return_values = {
-            "overall_uniqueness": format((info.overall_uniqueness) * 100.0, "00.0f")
-            + "%",
-            "overall_completeness": format((info.overall_completeness) * 100.0, "00.0f")
-            + "%",
-            "total_query_records": info.total_query_records,
-            "total_master_records": info.total_master_records,
-        }
-
-        info_previous = await session.scalar(
-            select(DataQuality).where(DataQuality.date == date_minus_one.date())
-        )
-
-        if info_previous:
-            return_values.update(
-                {
-                    "uniqueness_diff": format(
-                        (info.overall_uniqueness - info_previous.overall_uniqueness)
-                        * 100.0,
-                        "00.0f",
-                    )
-                    + "%",
-                    "completeness_diff": format(
-                        (info.overall_completeness - info_previous.overall_completeness)
-                        * 100,
-                        "00.0f",
-                    )
-                    + "%",
-                    "query_records_diff": info.total_query_records
-                    - info_previous.total_query_records,
-                    "master_records_diff": info.total_master_records
-                    - info_previous.total_master_records,
-                }
-            )
-        else:
-            return_values.update(
-                {
-                    "uniqueness_diff": "100%",
-                    "completeness_diff": "100%",
-                    "query_records_diff": info.total_query_records,
-                    "master_records_diff": info.total_master_records,
-                }
-            )
-
-        return_values.update(
-            {
-                "uniqueness_diff": "+" + return_values["uniqueness_diff"]
-                if not return_values["uniqueness_diff"].startswith("-")
-                else return_values["uniqueness_diff"],
-                "completeness_diff": "+" + return_values["completeness_diff"]
-                if not return_values["uniqueness_diff"].startswith("-")
-                else return_values["uniqueness_diff"],
-                "this_month_query_data": query_count,
-            }
+        return cached_response(
+            request,
+            response,
+            snapshot["stats"] | {"this_month_query_data": query_count},
         )
-        return return_values
 
     elif file_id == "graph":
-        date = datetime.now() - timedelta(days=365)
-        date = date.replace(day=1)
-        date_list = [date]
-
-        for i in range(12):
-            date_list.append((date_list[-1] + timedelta(days=31)).replace(day=1))
-
-        info = await session.scalars(
-            select(DataQuality).where(
-                or_(*[DataQuality.date == x.date() for x in date_list])
-            )
-        )
-        info = list(info)
-        return_list = []
-
-        for d in date_list:
-            data = None
-            for i in info:
-                if d.year == i.date.year and d.month == i.date.month:
-                    data = float(i.overall_completeness) * 100
-                    break
-
-            if not data:
-                data = 0.0
-
-            return_list.append({"date": str(d.date()), "value": str(int(data))})
+        snapshot = await dashboard.get(session)
 
-        return {"datas": return_list}
+        return cached_response(request, response, snapshot["graph"])
 
     elif file_id == "master":
         all_files = await session.scalars(
@@ -337,6 +196,11 @@ async def delete_specific_files(
             detail="Cannot delete files",
         )
     else:
+        sketched = await session.scalar(
+            select(FileSketch.file_id)
+            .where(FileSketch.file_id == str(file_id))
+            .limit(1)
+        )
         file = await session.scalar(
             delete(File).where(File.id == file_id).returning(File)
         )
@@ -352,17 +216,22 @@ async def delete_specific_files(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed"
             )
 
-        s3.meta.client.delete_object(
-            Bucket=settings.aws_storage_bucket_name,
-            Key=f"{file.type.title()}/{file.file_name}",
-        )
-        s3.meta.client.delete_object(
-            Bucket=settings.aws_storage_bucket_name,
-            Key=f"{file.type.title()}/{file.id}_{file.file_name}",
-        )
+        await storage.delete(f"{file.type.title()}/{file.file_name}")
+        await storage.delete(f"{file.type.title()}/{file.id}_{file.file_name}")
+        await storage.delete(sidecar_key(file_key(file)))
 
+        await quality.apply_delta(
+            session,
+            file.type,
+            valid=-file.valid,
+            total=-file.total,
+            unique=0 if sketched else -file.unique,
+        )
         await session.commit()
 
+        index_cache.invalidate(file.id)
+        dashboard.invalidate()
+
     return {"detail": "Deleted successfully"}
 
 
@@ -434,9 +303,60 @@ async def list_columns(
                 detail="You cannot access this file",
             )
 
-    df = read_file(file)
+    try:
+        columns = await read_columns(file)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+
+    return {"columns": columns}
+
+
+@router.get("/files/cache/stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
-    return {"columns": list(df.columns)}
+    if storage.cache is None:
+        return {"enabled": False}
+
+    return {"enabled": True, **storage.cache.summary()}
+
+
+@router.get("/files/{file_id}/profile", response_model=FileProfileResponse)
+async def get_profile(
+    file_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    file = await session.scalar(select(File).where(File.id == file_id))
+
+    if not file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+
+    if file.type == "QUERY" and file.user_id != current_user.id:
+        if current_user.role != "ADMIN":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You cannot access this file",
+            )
+
+    columns = await session.scalars(
+        select(FileColumnProfile)
+        .where(FileColumnProfile.file_id == file.id)
+        .order_by(FileColumnProfile.position)
+    )
+
+    return {
+        "file_id": file.id,
+        "total": file.total,
+        "columns": [x.to_dict() for x in columns],
+    }
 
 
 @router.post("/files/{file_id}/map")
@@ -445,7 +365,9 @@ async def map_file(
     master_file_id: Annotated[UUID, Form()],
     query_column: Annotated[str, Form()],
     master_column: Annotated[str, Form()],
-    background_tasks: BackgroundTasks,
+    score_cutoff: Annotated[int | None, Form(ge=0, le=100)] = None,
+    top_k: Annotated[int, Form(ge=1, le=50)] = 1,
+    engine: Annotated[Literal["fuzz", "tfidf"], Form()] = "fuzz",
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
@@ -464,12 +386,21 @@ async def map_file(
             detail="Cannot map master file",
         )
 
-    df = read_file(file)
-    master_df = read_file(master_file)
-
     task = await session.scalar(
         insert(Task)
-        .values(file_id=file.id, user_id=current_user.id, status="PENDING")
+        .values(
+            file_id=file.id,
+            master_file_id=master_file.id,
+            user_id=current_user.id,
+            status="PENDING",
+            params={
+                "query_column": query_column,
+                "master_column": master_column,
+                "score_cutoff": score_cutoff or 0,
+                "top_k": top_k,
+                "engine": engine,
+            },
+        )
         .returning(Task)
     )
 
@@ -481,144 +412,9 @@ async def map_file(
 
     await session.commit()
 
-    background_tasks.add_task(
-        map_data, df, master_df, query_column, master_column, file, current_user
-    )
-
     return {"detail": "Added to tasks successfully"}
 
 
-async def map_data(
-    df: pd.DataFrame, master_df, query_column, master_column, file, current_user
-):
-    session = get_async_session()
-
-    if not master_df.columns.isin(
-        [master_column if not master_column.isnumeric() else int(master_column)]
-    ).any():
-        await session.scalar(
-            update(Task)
-            .where(Task.file_id == file.id)
-            .values(status="FAILED")
-            .returning(Task)
-        )
-
-        return
-
-    if not df.columns.isin(
-        [query_column if not query_column.isnumeric() else int(query_column)]
-    ).any():
-        await session.scalar(
-            update(Task)
-            .where(Task.file_id == file.id)
-            .values(status="FAILED", ended=datetime.now())
-            .returning(Task)
-        )
-
-        return
-
-    data = []
-
-    for i, row in enumerate(
-        df[query_column if not query_column.isnumeric() else int(query_column)]
-    ):
-        partial = master_df[
-            master_column if not master_column.isnumeric() else int(master_column)
-        ].apply(lambda x: (fuzz.partial_ratio(x, row)))
-        full = master_df[
-            master_column if not master_column.isnumeric() else int(master_column)
-        ].apply(lambda x: (fuzz.ratio(x, row)))
-
-        if full.max() > 90:
-            data.append(
-                [
-                    df[
-                        query_column
-                        if not query_column.isnumeric()
-                        else int(query_column)
-                    ][i],
-                    master_df[
-                        master_column
-                        if not master_column.isnumeric()
-                        else int(master_column)
-                    ][partial.idxmax()],
-                    partial.max(),
-                    full.max(),
-                ]
-            )
-        elif partial.max() > 90:
-            data.append(
-                [
-                    df[
-                        query_column
-                        if not query_column.isnumeric()
-                        else int(query_column)
-                    ][i],
-                    master_df[
-                        master_column
-                        if not master_column.isnumeric()
-                        else int(master_column)
-                    ][partial.idxmax()],
-                    partial.max(),
-                    full.max(),
-                ]
-            )
-        else:
-            data.append(
-                [
-                    df[
-                        query_column
-                        if not query_column.isnumeric()
-                        else int(query_column)
-                    ][i],
-                    master_df[
-                        master_column
-                        if not master_column.isnumeric()
-                        else int(master_column)
-                    ][partial.idxmax()],
-                    partial.max(),
-                    full.max(),
-                ]
-            )
-
-    resulting_df = pd.DataFrame(
-        data, columns=["source", "destination", "partial", "full"]
-    )
-    buffer = io.BytesIO(resulting_df.to_csv(index=False).encode())
-    client.upload_fileobj(
-        buffer,
-        settings.aws_storage_bucket_name,
-        "result" + "/" + f"{file.id}_{file.file_name}",
-    )
-
-    result_file = await session.scalar(
-        insert(File)
-        .values(
-            file_name=f"{file.id}_{file.file_name}",
-            user_id=current_user.id,
-            description="",
-            unique=0,
-            valid=0,
-            total=0,
-            type="RESULT",
-        )
-        .returning(File)
-    )
-    await session.commit()
-
-    await session.scalar(
-        update(Task)
-        .where(Task.file_id == file.id)
-        .values(ended=datetime.now(), status="COMPLETED", file_id=result_file.id)
-        .returning(Task)
-    )
-
-    await session.commit()
-
-    del df
-    del master_df
-
-
 @router.post(
     "/files",
     status_code=status.HTTP_201_CREATED,
@@ -678,40 +474,6 @@ async def patch_file(
     if file.type == "MASTER" and current_user.role != "ADMIN":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
 
-    url = client.generate_presigned_url(
-        "get_object",
-        ExpiresIn=3600,
-        Params={
-            "Bucket": settings.aws_storage_bucket_name,
-            "Key": file.type.title() + "/" + file.file_name,
-        },
-    ).replace("s3.amazonaws.com/", "")
-
-    if file.file_name.endswith(".csv"):
-        response = requests.get(url)
-
-        df = pd.read_csv(
-            io.StringIO(response.content.decode("utf-8")), on_bad_lines="skip"
-        )
-    elif file.file_name.endswith(".txt"):
-        response = requests.get(url)
-        df = pd.read_fwf(
-            io.StringIO(response.content.decode("utf-8")),
-            header=None,
-            on_bad_lines="skip",
-        )
-
-    total_unique_values = df.nunique().sum()
-    total_non_na = df.count().sum()
-    total = df.size
-
-    await session.scalar(
-        update(File)
-        .values(unique=total_unique_values, valid=total_non_na, total=total)
-        .where(File.id == file.id)
-        .returning(File)
-    )
-
-    await session.commit()
+    await profile_file(session, file)
 
     return {"detail": "Success!"}
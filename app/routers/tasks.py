@@ -1,10 +1,13 @@
-import io
+import asyncio
+import json
 import re
+from datetime import datetime
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Form, HTTPException, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
@@ -12,8 +15,14 @@ from app.db import get_session
 from app.models.file import File
 from app.models.task import Task, TaskResponse, TasksResponse
 from app.models.user import User
-from app.routers.files import client, read_file, s3
+from app.services import jobs
 from app.services.auth import get_current_user
+from app.services.bucket import client, storage
+from app.services.events import events
+from app.services.files import read_file
+from app.services.mapping import alternates_key
+from app.services.matching import unpack_alternates
+from app.services.sidecar import write_result_sidecar, write_sidecar
 
 router = APIRouter()
 
@@ -36,6 +45,7 @@ async def get_all_tasks(
     )
 
     tasks = list(tasks)
+    positions = await jobs.queue_positions(session)
 
     to_return = []
 
@@ -51,6 +61,7 @@ async def get_all_tasks(
             file.file_name,
         )
         task["user_name"] = user.name
+        task["queue_position"] = positions.get(task["id"])
 
         task["url"] = client.generate_presigned_url(
             "get_object",
@@ -68,6 +79,39 @@ async def get_all_tasks(
     return {"tasks": to_return, "total": await count}
 
 
+@router.get("/tasks/stream")
+async def stream_tasks(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    """Server-sent events with the status and progress of the current user's
+    tasks as they change."""
+
+    async def generate():
+        queue = events.subscribe(current_user.id)
+
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), settings.events_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+
+                    continue
+
+                yield f"event: task\ndata: {json.dumps(event)}\n\n"
+        finally:
+            events.unsubscribe(current_user.id, queue)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: UUID,
@@ -80,14 +124,20 @@ async def get_task(
         select(Task).where(Task.id == task_id).limit(limit).offset(offset)
     )
 
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
     if current_user.id != task.user_id and current_user.role != "ADMIN":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    file = await session.scalar(select(File).where(File.id == Task.file_id))
+    file = await session.scalar(select(File).where(File.id == task.file_id))
 
     if not file:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
+    user = await session.scalar(select(User).where(User.id == task.user_id))
+
+    task = task.to_dict()
     task["url"] = client.generate_presigned_url(
         "get_object",
         ExpiresIn=3600,
@@ -98,12 +148,52 @@ async def get_task(
             else file.type.lower() + "/" + file.file_name,
         },
     ).replace("s3.amazonaws.com/", "")
-    task["file_name"] = file.name
-    task["user_name"] = current_user.name
+    task["file_name"] = re.sub(
+        r"[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}_",
+        "",
+        file.file_name,
+    )
+    task["user_name"] = user.name
+    task["queue_position"] = (await jobs.queue_positions(session)).get(task["id"])
 
     return task
 
 
+@router.post("/tasks/{task_id}/cancel")
+async def cancel_task(
+    task_id: UUID,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    task = await session.scalar(select(Task).where(Task.id == task_id))
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found",
+        )
+
+    if current_user.id != task.user_id and current_user.role != "ADMIN":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+    task = await session.scalar(
+        update(Task)
+        .where(Task.id == task_id, Task.status.in_(["PENDING", "IN_PROGRESS"]))
+        .values(status="CANCELLED", ended=datetime.now())
+        .returning(Task)
+    )
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Task already finished",
+        )
+
+    await session.commit()
+
+    return {"detail": "Task cancelled"}
+
+
 @router.get("/tasks/{task_id}/versions")
 async def get_versions(
     task_id: UUID,
@@ -125,10 +215,10 @@ async def get_versions(
             detail="File not found",
         )
 
-    versions = client.list_object_versions(
-        Bucket=settings.aws_storage_bucket_name,
-        Prefix="result" + "/" + file.file_name,
-    )
+    key = "result" + "/" + file.file_name
+    # The listing is by prefix, which also matches other objects whose key
+    # starts with the result's.
+    versions = [x for x in await storage.list_versions(key) if x["Key"] == key]
 
     version_return = [
         {
@@ -141,7 +231,7 @@ async def get_versions(
                 x["Key"],
             ),
         }
-        for x in versions["Versions"]
+        for x in versions
     ]
 
     return {"versions": version_return}
@@ -168,7 +258,7 @@ async def get_data(
             detail="File not found",
         )
 
-    data = read_file(file, is_csv=True)
+    data = await read_file(file, is_csv=True)
     data_json = data.to_dict(orient="records")
     nodes = set([x["source"] for x in data_json])
     node_dest = set([x["destination"] for x in data_json])
@@ -216,9 +306,17 @@ async def get_data_table(
             detail="File not found",
         )
 
-    data = read_file(file, is_csv=True)
+    data = (await read_file(file, is_csv=True)).to_dict(orient="records")
 
-    return data.to_dict(orient="records")
+    try:
+        alternates = await storage.get(alternates_key("result" + "/" + file.file_name))
+    except FileNotFoundError:
+        return data
+
+    for row, row_alternates in zip(data, unpack_alternates(alternates)):
+        row["alternates"] = row_alternates
+
+    return data
 
 
 @router.put("/tasks/{task_id}")
@@ -244,7 +342,7 @@ async def edit_task(
             detail="File not found",
         )
 
-    df = read_file(file, is_csv=True)
+    df = await read_file(file, is_csv=True)
 
     df.loc[
         (df["source"] == source),
@@ -256,12 +354,10 @@ async def edit_task(
         ["destination"],
     ] = destination
 
-    buffer = io.BytesIO(df.to_csv(index=False).encode())
-    client.upload_fileobj(
-        buffer,
-        settings.aws_storage_bucket_name,
-        "result" + "/" + f"{file.file_name}",
+    await storage.put(
+        "result" + "/" + f"{file.file_name}", df.to_csv(index=False).encode()
     )
+    await write_sidecar(file, df)
 
     return {"detail": "Success!"}
 
@@ -288,24 +384,10 @@ async def revert_version(
             detail="File not found",
         )
 
-    versions = s3.meta.client.list_object_versions(
-        Bucket=settings.aws_storage_bucket_name, Prefix=f"result/{file.file_name}"
-    ).get("Versions", [])
+    key = f"result/{file.file_name}"
 
-    s3.meta.client.copy(
-        {
-            "Bucket": settings.aws_storage_bucket_name,
-            "Key": versions[0]["Key"],
-            "VersionId": version_id,
-        },
-        settings.aws_storage_bucket_name,
-        versions[0]["Key"],
-    )
-
-    s3.meta.client.delete_object(
-        Bucket=settings.aws_storage_bucket_name,
-        Key=f"result/{file.file_name}",
-        VersionId=version_id,
-    )
+    await storage.copy(key, key, version_id)
+    await storage.delete(key, version_id)
+    await write_result_sidecar(key)
 
     return {"detail": "Success!"}
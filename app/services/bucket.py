@@ -0,0 +1,37 @@
+import boto3
+
+from app.config import get_settings
+from app.models.file import File
+from app.services.object_cache import ObjectCache
+from app.services.storage import ObjectStorage
+
+settings = get_settings()
+
+aws_session = boto3.Session(
+    aws_access_key_id=settings.aws_access_key_id,
+    aws_secret_access_key=settings.aws_access_key,
+)
+
+s3 = aws_session.resource("s3", endpoint_url=settings.aws_endpoint_url)
+client = aws_session.client("s3", endpoint_url=settings.aws_endpoint_url)
+bucket = s3.Bucket(settings.aws_storage_bucket_name)
+storage = ObjectStorage(
+    client,
+    settings.aws_storage_bucket_name,
+    settings.storage_max_connections,
+    ObjectCache(
+        settings.object_cache_dir,
+        settings.object_cache_max_bytes,
+        settings.object_cache_fresh_seconds,
+    )
+    if settings.object_cache_max_bytes
+    else None,
+)
+
+
+def file_key(file: File) -> str:
+    return (
+        file.type.title() + "/" + file.file_name
+        if file.type.lower() != "result"
+        else file.type.lower() + "/" + file.file_name
+    )
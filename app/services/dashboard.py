@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.file import DataQuality
+
+settings = get_settings()
+
+
+def graph_months() -> list[datetime]:
+    """First days of the thirteen months shown by the dashboard graph."""
+    date = (datetime.now() - timedelta(days=365)).replace(day=1)
+    dates = [date]
+
+    for _ in range(12):
+        dates.append((dates[-1] + timedelta(days=31)).replace(day=1))
+
+    return dates
+
+
+def signed(values: dict) -> dict:
+    return values | {
+        "uniqueness_diff": "+" + values["uniqueness_diff"]
+        if not values["uniqueness_diff"].startswith("-")
+        else values["uniqueness_diff"],
+        "completeness_diff": "+" + values["completeness_diff"]
+        if not values["uniqueness_diff"].startswith("-")
+        else values["uniqueness_diff"],
+    }
+
+
+def build_stats(rows: dict) -> dict:
+    """Dashboard stats from the data quality ``rows`` by month, without the
+    per-user ``this_month_query_data``."""
+    date = datetime.now().replace(day=1).date()
+    date_minus_one = (datetime.now() - timedelta(days=datetime.now().day)).replace(
+        day=1
+    )
+    info = rows.get(date) or rows.get(
+        (date_minus_one - timedelta(days=date_minus_one.day)).replace(day=1).date()
+    )
+
+    if not info:
+        return signed(
+            {
+                "overall_uniqueness": format(0.0, "00.0f") + "%",
+                "overall_completeness": format(0.0, "00.0f") + "%",
+                "total_query_records": 0,
+                "total_master_records": 0,
+                "uniqueness_diff": format(0.0, "00.0f") + "%",
+                "completeness_diff": format(0.0, "00.0f") + "%",
+                "query_records_diff": 0,
+                "master_records_diff": 0,
+            }
+        )
+
+    values = {
+        "overall_uniqueness": format((info.overall_uniqueness) * 100.0, "00.0f") + "%",
+        "overall_completeness": format((info.overall_completeness) * 100.0, "00.0f")
+        + "%",
+        "total_query_records": info.total_query_records,
+        "total_master_records": info.total_master_records,
+    }
+    previous = rows.get(date_minus_one.date())
+
+    if previous:
+        values.update(
+            {
+                "uniqueness_diff": format(
+                    (info.overall_uniqueness - previous.overall_uniqueness) * 100.0,
+                    "00.0f",
+                )
+                + "%",
+                "completeness_diff": format(
+                    (info.overall_completeness - previous.overall_completeness) * 100,
+                    "00.0f",
+                )
+                + "%",
+                "query_records_diff": info.total_query_records
+                - previous.total_query_records,
+                "master_records_diff": info.total_master_records
+                - previous.total_master_records,
+            }
+        )
+    else:
+        values.update(
+            {
+                "uniqueness_diff": "100%",
+                "completeness_diff": "100%",
+                "query_records_diff": info.total_query_records,
+                "master_records_diff": info.total_master_records,
+            }
+        )
+
+    return signed(values)
+
+
+def build_graph(rows: dict, months: list[datetime]) -> dict:
+    datas = []
+
+    for month in months:
+        info = rows.get(month.date())
+        value = float(info.overall_completeness) * 100 if info else 0.0
+        datas.append({"date": str(month.date()), "value": str(int(value))})
+
+    return {"datas": datas}
+
+
+def etag(body: dict) -> str:
+    digest = hashlib.sha1(
+        json.dumps(body, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+    return f'"{digest}"'
+
+
+class Dashboard:
+    """Stats and graph of the dashboard, computed from one range query over
+    ``data_quality`` and kept for ``dashboard_ttl_seconds``.
+
+    Changes to ``data_quality`` in this process call :meth:`invalidate`;
+    changes made by other processes, e.g. a worker ingesting a file, show
+    up once the snapshot expires.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.expires = 0.0
+        self.lock = asyncio.Lock()
+
+    async def refresh(self, session: AsyncSession) -> dict:
+        months = graph_months()
+        # The stats fall back to the month before last, which lies inside
+        # the graph range too.
+        rows = await session.scalars(
+            select(DataQuality).where(DataQuality.date >= months[0].date())
+        )
+        rows = {x.date: x for x in rows}
+
+        return {"stats": build_stats(rows), "graph": build_graph(rows, months)}
+
+    async def get(self, session: AsyncSession) -> dict:
+        async with self.lock:
+            if self.snapshot is None or time.monotonic() >= self.expires:
+                self.snapshot = await self.refresh(session)
+                self.expires = time.monotonic() + settings.dashboard_ttl_seconds
+
+            return self.snapshot
+
+    def invalidate(self):
+        self.snapshot = None
+
+
+dashboard = Dashboard()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import logging
+
+import asyncpg
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("events")
+
+# Postgres channel the tasks table trigger notifies on.
+CHANNEL = "task_events"
+
+
+class TaskEvents:
+    """Fan task change notifications from Postgres out to subscribers.
+
+    Workers run in other processes, so changes arrive through LISTEN on a
+    single connection per API process, opened with the first subscriber and
+    reopened if it drops. Each subscriber gets the events of one user; when a
+    subscriber falls ``events_queue_size`` events behind the oldest are
+    dropped.
+    """
+
+    def __init__(self):
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.events_queue_size)
+        self.subscribers.setdefault(str(user_id), set()).add(queue)
+
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(str(user_id), set())
+        queues.discard(queue)
+
+        if not queues:
+            self.subscribers.pop(str(user_id), None)
+
+    def publish(self, event: dict):
+        for queue in self.subscribers.get(event["user_id"], ()):
+            if queue.full():
+                queue.get_nowait()
+
+            queue.put_nowait(event)
+
+    def _notify(self, connection, pid, channel, payload):
+        self.publish(json.loads(payload))
+
+    async def _listen(self):
+        while True:
+            try:
+                connection = await asyncpg.connect(
+                    user=settings.postgres_user,
+                    password=settings.postgres_password,
+                    host=settings.postgres_server,
+                    port=settings.postgres_port,
+                    database=settings.postgres_db,
+                )
+
+                try:
+                    await connection.add_listener(CHANNEL, self._notify)
+
+                    while not connection.is_closed():
+                        await asyncio.sleep(settings.events_keepalive_seconds)
+                finally:
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("listening for task events failed")
+
+            await asyncio.sleep(settings.events_keepalive_seconds)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+
+            self._listener = None
+
+
+events = TaskEvents()
@@ -0,0 +1,171 @@
+import asyncio
+import io
+from collections import OrderedDict
+from typing import Generator
+
+import pandas as pd
+import requests
+from fastapi import HTTPException, status
+
+from app.config import get_settings
+from app.models.file import File
+from app.services.bucket import file_key, storage
+from app.services.sidecar import parse_sidecar, sidecar_key
+
+settings = get_settings()
+
+COLUMNS_CACHE_SIZE = 1024
+# Lines read_fwf infers a fixed-width layout from by default.
+FWF_INFER_ROWS = 100
+_columns: OrderedDict[tuple, list] = OrderedDict()
+
+
+def parse_file(file: File, data: bytes, is_csv=None, **kwargs) -> pd.DataFrame:
+    if file.type.lower() == "result":
+        # Unmatched rows have an empty destination, which must stay a string
+        # rather than become NaN.
+        kwargs.setdefault("keep_default_na", False)
+
+    if file.file_name.endswith(".csv") or is_csv:
+        df = pd.read_csv(io.StringIO(data.decode("utf-8")), **kwargs)
+    elif file.file_name.endswith(".txt"):
+        df = pd.read_fwf(io.StringIO(data.decode("utf-8")), header=None, **kwargs)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File type not supported",
+        )
+
+    return df
+
+
+async def read_file(
+    file: File, is_csv=None, columns: list | None = None, **kwargs
+) -> pd.DataFrame:
+    """Read ``file`` off the event loop, limited to ``columns`` if given.
+
+    The Parquet sidecar is preferred when there is one; ``kwargs`` go to the
+    pandas reader and force reading the original file.
+    """
+    if not (file.file_name.endswith((".csv", ".txt")) or is_csv):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File type not supported",
+        )
+
+    if not kwargs:
+        try:
+            data = await storage.get(sidecar_key(file_key(file)))
+        except FileNotFoundError:
+            pass
+        else:
+            return await asyncio.to_thread(parse_sidecar, file, data, columns, is_csv)
+
+    data = await storage.get(file_key(file))
+    df = await asyncio.to_thread(parse_file, file, data, is_csv, **kwargs)
+
+    return df if columns is None else df[[x for x in columns if x in df]]
+
+
+def parse_header(file: File, sample: bytes, complete: bool) -> list | None:
+    """Column names from the first bytes of ``file``, or None when
+    ``sample`` does not hold enough full lines yet."""
+    fixed_width = file.file_name.endswith(".txt")
+
+    if not complete:
+        sample = sample[: sample.rfind(b"\n") + 1]
+
+        if not sample or (fixed_width and sample.count(b"\n") < FWF_INFER_ROWS):
+            return None
+
+    text = io.StringIO(sample.decode("utf-8", errors="ignore"))
+
+    if fixed_width:
+        return list(pd.read_fwf(text, header=None, infer_nrows=FWF_INFER_ROWS).columns)
+
+    return list(pd.read_csv(text, nrows=0).columns)
+
+
+async def read_columns(file: File) -> list:
+    """Column names of ``file`` read from its first bytes, cached per file
+    version.
+
+    CSV headers need the first line only; fixed-width layouts are inferred
+    from the first ``FWF_INFER_ROWS`` lines, as when reading the whole file.
+    Missing objects raise ``FileNotFoundError``.
+    """
+    version = (file.id, file.modified)
+
+    if version in _columns:
+        _columns.move_to_end(version)
+
+        return _columns[version]
+
+    if not file.file_name.endswith((".csv", ".txt")):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File type not supported",
+        )
+
+    size = settings.columns_sample_bytes
+    columns = None
+
+    while columns is None:
+        sample, complete = await storage.get_range(file_key(file), 0, size - 1)
+        columns = await asyncio.to_thread(parse_header, file, sample, complete)
+        size *= 4
+
+    _columns[version] = columns
+
+    if len(_columns) > COLUMNS_CACHE_SIZE:
+        _columns.popitem(last=False)
+
+    return columns
+
+
+def iter_file(
+    file: File,
+    chunksize: int,
+    is_csv=None,
+    skip: int = 0,
+    stream: dict | None = None,
+    **kwargs,
+) -> Generator[pd.DataFrame, None, None]:
+    """Stream ``file`` from storage as DataFrames of ``chunksize`` rows,
+    starting after the first ``skip`` rows; ``kwargs`` go to the pandas
+    reader.
+
+    ``stream`` is kept updated with the bytes ``read`` out of the object
+    ``size``.
+    """
+    stream = {} if stream is None else stream
+
+    if not (file.file_name.endswith((".csv", ".txt")) or is_csv):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File type not supported",
+        )
+
+    with requests.get(storage.url(file_key(file)), stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream["size"] = int(response.headers.get("Content-Length", 0))
+
+        if file.file_name.endswith(".csv") or is_csv:
+            reader = pd.read_csv(response.raw, chunksize=chunksize, **kwargs)
+        else:
+            reader = pd.read_fwf(
+                response.raw, header=None, chunksize=chunksize, **kwargs
+            )
+
+        with reader:
+            for chunk in reader:
+                stream["read"] = response.raw.tell()
+
+                if skip >= len(chunk):
+                    skip -= len(chunk)
+
+                    continue
+
+                yield chunk.iloc[skip:]
+                skip = 0
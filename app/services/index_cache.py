@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from app.config import get_settings
+from app.services.matching import MasterIndex
+
+settings = get_settings()
+logger = logging.getLogger("index_cache")
+
+
+def _entry_path(file_id: str, column, modified: datetime, ngram: int) -> str:
+    digest = hashlib.sha1(
+        f"{column}:{modified.isoformat()}:{ngram}:{MasterIndex.version}".encode()
+    ).hexdigest()
+
+    return os.path.join(settings.index_cache_dir, str(file_id), digest)
+
+
+def _size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def _entries() -> list[str]:
+    if not os.path.isdir(settings.index_cache_dir):
+        return []
+
+    return [
+        os.path.join(settings.index_cache_dir, file_id, digest)
+        for file_id in os.listdir(settings.index_cache_dir)
+        if not file_id.startswith(".")
+        for digest in os.listdir(os.path.join(settings.index_cache_dir, file_id))
+    ]
+
+
+def evict(max_bytes: int | None = None):
+    """Remove least recently used entries until the cache fits ``max_bytes``."""
+    max_bytes = settings.index_cache_max_bytes if max_bytes is None else max_bytes
+    entries = [(os.path.getmtime(x), _size(x), x) for x in _entries()]
+    total = sum(size for _, size, _ in entries)
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        logger.info("evicted master index %s", path)
+
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+
+def exists(file, column, ngram: int) -> bool:
+    """Whether an entry is cached, without loading it."""
+    return os.path.isdir(_entry_path(file.id, column, file.modified, ngram))
+
+
+def get(file, column, ngram: int) -> MasterIndex | None:
+    path = _entry_path(file.id, column, file.modified, ngram)
+
+    if not os.path.isdir(path):
+        return None
+
+    try:
+        index = MasterIndex.load(path)
+    except (OSError, ValueError):
+        logger.warning("discarding unreadable master index %s", path)
+        shutil.rmtree(path, ignore_errors=True)
+
+        return None
+
+    os.utime(path)
+
+    return index
+
+
+def put(file, column, index: MasterIndex):
+    path = _entry_path(file.id, column, file.modified, index.ngrams.n)
+
+    if os.path.isdir(path):
+        return
+
+    os.makedirs(settings.index_cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".", dir=settings.index_cache_dir)
+
+    try:
+        index.save(tmp)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.rename(tmp, path)
+    except OSError:
+        # Another job stored the same entry first.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    evict()
+
+
+def invalidate(file_id: str):
+    shutil.rmtree(
+        os.path.join(settings.index_cache_dir, str(file_id)), ignore_errors=True
+    )
+
+
+def pin(file, column, index: MasterIndex) -> str:
+    """Store ``index`` and return a private directory holding it for the
+    length of a job; release it with :func:`unpin`.
+
+    The files are hard links to the cache entry when there is one, so a
+    concurrent eviction cannot pull the arrays out from under pool workers
+    that memory-map them.
+    """
+    put(file, column, index)
+    os.makedirs(settings.index_cache_dir, exist_ok=True)
+    path = tempfile.mkdtemp(prefix=".", dir=settings.index_cache_dir)
+    entry = _entry_path(file.id, column, file.modified, index.ngrams.n)
+
+    try:
+        for name in os.listdir(entry):
+            os.link(os.path.join(entry, name), os.path.join(path, name))
+    except OSError:
+        index.save(path)
+
+    return path
+
+
+def unpin(path: str):
+    shutil.rmtree(path, ignore_errors=True)
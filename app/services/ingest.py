@@ -0,0 +1,288 @@
+"""Profile uploaded files in the background.
+
+Files are uploaded straight to the bucket with the presigned POST from
+``POST /files``. The ingest loop polls for files that are not profiled yet,
+probes the bucket for their object and, once the upload has landed, profiles
+it, writes its Parquet sidecar and prewarms the master indexes of master
+files, without waiting for ``PATCH /files/{file_id}``.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db import get_async_session
+from app.models.file import File, FileColumnProfile, FileSketch
+from app.services import index_cache, quality
+from app.services.bucket import file_key, storage
+from app.services.dashboard import dashboard
+from app.services.files import iter_file, read_file
+from app.services.matching import MasterIndex
+from app.services.profiling import Profiler
+from app.services.sidecar import SidecarSpool, sidecar_key
+
+settings = get_settings()
+logger = logging.getLogger("ingest")
+
+
+async def profile_file(session: AsyncSession, file: File) -> File:
+    """Profile ``file`` in one streaming pass, storing its counts, column
+    sketches and column profiles and rewriting its Parquet sidecar."""
+    profiler = Profiler()
+    spool = SidecarSpool()
+    chunks = iter_file(file, settings.match_stream_rows, on_bad_lines="skip")
+
+    try:
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            await asyncio.to_thread(profiler.update, chunk)
+            await asyncio.to_thread(spool.write, chunk)
+
+        sidecar = await asyncio.to_thread(spool.finish)
+
+        if sidecar:
+            await storage.upload(sidecar_key(file_key(file)), sidecar)
+        else:
+            await storage.delete(sidecar_key(file_key(file)))
+    finally:
+        chunks.close()
+        spool.close()
+
+    previous = (
+        await session.execute(
+            select(
+                File.unique,
+                File.valid,
+                File.total,
+                select(FileSketch.file_id)
+                .where(FileSketch.file_id == File.id)
+                .exists()
+                .label("sketched"),
+            )
+            .where(File.id == file.id)
+            .with_for_update(of=File)
+        )
+    ).one()
+    file = await session.scalar(
+        update(File)
+        .values(
+            unique=profiler.unique,
+            valid=profiler.valid,
+            total=profiler.total,
+            profiled=func.now(),
+        )
+        .where(File.id == file.id)
+        .returning(File)
+    )
+    sketches = profiler.sketches()
+    await session.execute(delete(FileSketch).where(FileSketch.file_id == file.id))
+
+    if sketches:
+        await session.execute(
+            insert(FileSketch).values(
+                [
+                    {"file_id": file.id, "column": name, "sketch": sketch.to_bytes()}
+                    for name, sketch in sketches.items()
+                ]
+            )
+        )
+
+    await quality.apply_delta(
+        session,
+        file.type,
+        valid=file.valid - previous.valid,
+        total=file.total - previous.total,
+        unique=0 if previous.sketched else -previous.unique,
+        sketches=sketches,
+    )
+
+    await session.execute(
+        delete(FileColumnProfile).where(FileColumnProfile.file_id == file.id)
+    )
+
+    if profiler.columns:
+        await session.execute(
+            insert(FileColumnProfile).values(
+                [
+                    {
+                        "file_id": file.id,
+                        "position": position,
+                        "name": str(name),
+                        "type": column.type,
+                        "count": column.count,
+                        "nulls": column.nulls,
+                        "null_rate": column.null_rate,
+                        "cardinality": column.sketch.count(),
+                        "min_length": column.min_length,
+                        "max_length": column.max_length,
+                        "top_values": column.frequent.top(settings.profile_top_values),
+                    }
+                    for position, (name, column) in enumerate(profiler.columns.items())
+                ]
+            )
+        )
+
+    await session.commit()
+
+    index_cache.invalidate(file.id)
+    dashboard.invalidate()
+
+    return file
+
+
+async def prewarm_indexes(session: AsyncSession, file: File):
+    """Build and cache the master indexes of the first text columns of a
+    profiled master ``file``, so its first map jobs skip the build."""
+    columns = await session.scalars(
+        select(FileColumnProfile.name)
+        .where(FileColumnProfile.file_id == file.id, FileColumnProfile.type == "string")
+        .order_by(FileColumnProfile.position)
+        .limit(settings.ingest_prewarm_columns)
+    )
+
+    for column in columns:
+        if index_cache.exists(file, column, settings.match_ngram):
+            continue
+
+        key = column if not column.isnumeric() else int(column)
+        df = await read_file(file, columns=[key])
+
+        if key not in df.columns:
+            continue
+
+        index = await asyncio.to_thread(
+            MasterIndex.build, df[key], settings.match_ngram
+        )
+        await asyncio.to_thread(index_cache.put, file, column, index)
+        logger.info("prewarmed master index of %s column %s", file.id, column)
+
+
+def claimable():
+    """Files that are not profiled yet, have attempts left and are not being
+    ingested by a live worker."""
+    return (
+        File.profiled.is_(None),
+        File.ingest_attempts < settings.ingest_max_attempts,
+        or_(
+            File.ingest_claimed.is_(None),
+            File.ingest_claimed
+            < func.now() - timedelta(seconds=settings.ingest_lease_seconds),
+        ),
+    )
+
+
+async def pending(session: AsyncSession) -> list[File]:
+    """Files created recently enough that their upload may still land, and
+    not ingested yet."""
+    files = await session.scalars(
+        select(File)
+        .where(
+            *claimable(),
+            or_(File.type == "QUERY", File.type == "MASTER"),
+            File.created
+            > func.now() - timedelta(seconds=settings.ingest_window_seconds),
+        )
+        .order_by(File.created)
+    )
+
+    return list(files)
+
+
+async def uploaded(file: File) -> bool:
+    try:
+        await storage.get_range(file_key(file), 0, 0)
+    except FileNotFoundError:
+        return False
+
+    return True
+
+
+async def claim(session: AsyncSession, file_id: str) -> File | None:
+    """Take the lease on ``file_id`` unless another worker holds it.
+
+    ``profiled`` is only set once profiling succeeds, so a file whose worker
+    failed or died is claimed again, up to ``ingest_max_attempts`` times.
+    """
+    file = await session.scalar(
+        update(File)
+        .where(File.id == file_id, *claimable())
+        .values(
+            ingest_claimed=func.now(),
+            ingest_attempts=File.ingest_attempts + 1,
+            modified=File.modified,
+        )
+        .returning(File)
+    )
+    await session.commit()
+
+    return file
+
+
+async def release(session: AsyncSession, file_id: str):
+    await session.execute(
+        update(File)
+        .where(File.id == file_id)
+        .values(ingest_claimed=None, modified=File.modified)
+    )
+    await session.commit()
+
+
+async def ingest(file: File):
+    async with get_async_session() as session:
+        file = await profile_file(session, file)
+
+        if file.type == "MASTER":
+            await prewarm_indexes(session, file)
+
+    logger.info("ingested file %s", file.id)
+
+
+async def poll() -> int:
+    """Ingest the pending files whose upload has landed, returning how many."""
+    async with get_async_session() as session:
+        files = await pending(session)
+
+    ingested = 0
+
+    for file in files:
+        if not await uploaded(file):
+            continue
+
+        async with get_async_session() as session:
+            file = await claim(session, file.id)
+
+        if file is None:
+            continue
+
+        try:
+            await ingest(file)
+        except Exception:
+            logger.exception(
+                "ingesting file %s failed (attempt %d of %d)",
+                file.id,
+                file.ingest_attempts,
+                settings.ingest_max_attempts,
+            )
+
+            async with get_async_session() as session:
+                await release(session, file.id)
+
+            continue
+
+        ingested += 1
+
+    return ingested
+
+
+async def run():
+    """Poll for uploaded files every ``ingest_poll_seconds`` until cancelled."""
+    while True:
+        try:
+            await poll()
+        except Exception:
+            logger.exception("polling for uploaded files failed")
+
+        await asyncio.sleep(settings.ingest_poll_seconds)
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db import get_async_session
+from app.models.task import Task
+
+settings = get_settings()
+logger = logging.getLogger("jobs")
+
+
+# Advisory lock serializing claims, so the running caps hold across workers.
+CLAIM_LOCK = 0x6D6170
+
+ACTIVE = ("PENDING", "IN_PROGRESS")
+
+
+def max_running() -> int:
+    return settings.jobs_max_running or os.cpu_count() or 1
+
+
+async def claim(session: AsyncSession, worker_id: str) -> Task | None:
+    """Claim the next pending task for ``worker_id``.
+
+    At most ``jobs_max_running`` tasks run at once (one per core by default)
+    and at most ``jobs_max_per_user`` per user. Users take turns: the user
+    with the fewest running tasks goes first, then the one whose last queued
+    or running task was claimed longest ago, then the oldest task.
+
+    Only queued and running tasks are aggregated, through the partial index
+    ``ix_tasks_active``, so a claim does not slow down as finished tasks pile
+    up.
+    """
+    await session.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK)))
+    running = await session.scalar(
+        select(func.count()).select_from(Task).where(Task.status == "IN_PROGRESS")
+    )
+
+    if running >= max_running():
+        await session.commit()
+
+        return None
+
+    users = (
+        select(
+            Task.user_id,
+            func.count().filter(Task.status == "IN_PROGRESS").label("running"),
+            func.max(Task.claimed).label("claimed"),
+        )
+        .where(Task.status.in_(ACTIVE))
+        .group_by(Task.user_id)
+        .subquery()
+    )
+    pending = (
+        select(Task.id)
+        .join(users, users.c.user_id == Task.user_id)
+        .where(Task.status == "PENDING", users.c.running < settings.jobs_max_per_user)
+        .order_by(users.c.running, users.c.claimed.asc().nulls_first(), Task.started)
+        .limit(1)
+        .with_for_update(of=Task, skip_locked=True)
+        .scalar_subquery()
+    )
+    task = await session.scalar(
+        update(Task)
+        .where(Task.id == pending)
+        .values(
+            status="IN_PROGRESS",
+            worker_id=worker_id,
+            heartbeat=func.now(),
+            claimed=func.now(),
+            attempts=Task.attempts + 1,
+            ended=Task.ended,
+        )
+        .returning(Task)
+    )
+    await session.commit()
+
+    return task
+
+
+async def queue_positions(session: AsyncSession) -> dict[str, int]:
+    """Estimate the position of every pending task, assuming users take
+    turns and each user's tasks run oldest first."""
+    pending = await session.execute(
+        select(Task.id, Task.user_id)
+        .where(Task.status == "PENDING")
+        .order_by(Task.started)
+    )
+    turns = {}
+    order = []
+
+    for task_id, user_id in pending:
+        turns[user_id] = turns.get(user_id, 0) + 1
+        order.append((turns[user_id], len(order), task_id))
+
+    return {task_id: i + 1 for i, (*_, task_id) in enumerate(sorted(order))}
+
+
+async def heartbeat(session: AsyncSession, worker_id: str):
+    await session.execute(
+        update(Task)
+        .where(Task.worker_id == worker_id, Task.status == "IN_PROGRESS")
+        .values(heartbeat=func.now(), ended=Task.ended)
+    )
+    await session.commit()
+
+
+async def is_cancelled(task_id: str) -> bool:
+    async with get_async_session() as session:
+        status = await session.scalar(select(Task.status).where(Task.id == task_id))
+
+    return status == "CANCELLED"
+
+
+async def keep_alive(worker_id: str, task_id: str, cancel: Callable[[], object]):
+    """Send heartbeats for ``worker_id`` until cancelled, and call ``cancel``
+    once ``task_id`` has been cancelled through the API."""
+    while True:
+        await asyncio.sleep(settings.worker_heartbeat_seconds)
+
+        try:
+            async with get_async_session() as session:
+                await heartbeat(session, worker_id)
+
+            if await is_cancelled(task_id):
+                cancel()
+
+                return
+        except Exception:
+            logger.exception("heartbeat for worker %s failed", worker_id)
+
+
+async def requeue_stale(session: AsyncSession) -> int:
+    """Put tasks whose worker stopped sending heartbeats back in the queue.
+
+    Tasks that already used ``worker_max_attempts`` attempts are failed
+    instead. Returns the number of requeued tasks.
+    """
+    stale = (
+        Task.status == "IN_PROGRESS",
+        Task.heartbeat < func.now() - timedelta(seconds=settings.worker_stale_seconds),
+    )
+
+    await session.execute(
+        update(Task)
+        .where(*stale, Task.attempts >= settings.worker_max_attempts)
+        .values(status="FAILED", worker_id=None, ended=datetime.now())
+    )
+    requeued = await session.scalars(
+        update(Task)
+        .where(*stale)
+        .values(status="PENDING", worker_id=None, ended=Task.ended)
+        .returning(Task.id)
+    )
+    requeued = list(requeued)
+    await session.commit()
+
+    for task_id in requeued:
+        logger.warning("requeued task %s from a dead worker", task_id)
+
+    return len(requeued)
+
+
+async def release(session: AsyncSession, task_id: str):
+    """Return a claimed task to the queue without counting the attempt."""
+    await session.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.status == "IN_PROGRESS")
+        .values(
+            status="PENDING",
+            worker_id=None,
+            attempts=Task.attempts - 1,
+            ended=Task.ended,
+        )
+    )
+    await session.commit()
+
+
+class ProgressReporter:
+    """Publish rows processed, throughput and ETA of a task, writing to the
+    task row at most once per ``progress_interval_seconds``.
+
+    ``rows`` is where the run starts, e.g. a resumed checkpoint, so the
+    throughput only counts rows matched by this run.
+    """
+
+    def __init__(self, task_id: str, rows: int = 0):
+        self.task_id = task_id
+        self.rows = rows
+        self.started = time.monotonic()
+        self.reported = self.started
+
+    async def __call__(self, rows: int, fraction: float | None = None):
+        now = time.monotonic()
+
+        if now - self.reported < settings.progress_interval_seconds:
+            return
+
+        self.reported = now
+        rate = (rows - self.rows) / (now - self.started)
+        total = round(rows / fraction) if fraction else None
+        eta = (
+            datetime.now(timezone.utc) + timedelta(seconds=(total - rows) / rate)
+            if total and rate
+            else None
+        )
+
+        async with get_async_session() as session:
+            await session.execute(
+                update(Task)
+                .where(Task.id == self.task_id)
+                .values(
+                    rows_processed=rows,
+                    rows_total=total,
+                    rows_per_second=rate,
+                    eta=eta,
+                    ended=Task.ended,
+                )
+            )
+            await session.commit()
@@ -0,0 +1,479 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import BrokenExecutor
+from datetime import datetime
+from typing import Awaitable, Callable, Generator
+
+import httpx
+import numpy as np
+import pandas as pd
+from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import get_settings
+from app.db import get_async_session
+from app.models.file import File
+from app.models.task import Task
+from app.services import index_cache, jobs
+from app.services.bucket import client, storage
+from app.services.files import iter_file, read_file
+from app.services.matching import (
+    EXACT,
+    FUZZY,
+    NORMALIZED,
+    RESULT_COLUMNS,
+    MasterIndex,
+    as_choices,
+    distinct,
+    pack_alternates,
+    resolve_keys,
+    results_frame,
+    verify_matches,
+)
+from app.services.pool import match_in_pool
+from app.services.sidecar import write_result_sidecar
+from app.services.storage import MultipartUpload
+
+settings = get_settings()
+logger = logging.getLogger("mapping")
+
+# Alternates live under their own prefix, so they never show up in the
+# version history of the result they belong to.
+ALTERNATES_PREFIX = "alternates/"
+ALTERNATES = ".alternates.npz"
+
+TRANSIENT_ERRORS = (
+    OSError,
+    BotoCoreError,
+    ClientError,
+    SQLAlchemyError,
+    BrokenExecutor,
+    httpx.HTTPError,
+)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether ``error`` may pass on another attempt, e.g. a lost connection
+    to storage or the database or a crashed pool worker. Errors in the input,
+    such as a missing column or a failed verification, fail the same way
+    every time."""
+    return isinstance(error, TRANSIENT_ERRORS) and not isinstance(
+        error, FileNotFoundError
+    )
+
+
+def alternates_key(key: str) -> str:
+    """Key of the alternates of the result at ``key``."""
+    return ALTERNATES_PREFIX + key + ALTERNATES
+
+
+def alternates_segment_key(key: str, segment: int) -> str:
+    return f"{alternates_key(key)}.{segment}"
+
+
+async def save_alternates_segment(key: str, segment: int, alternates: list):
+    buffer = io.BytesIO()
+    np.savez(buffer, *(np.concatenate(x) for x in zip(*alternates)))
+    await storage.put(alternates_segment_key(key, segment), buffer.getvalue())
+
+
+async def load_alternates_segment(key: str, segment: int) -> list[np.ndarray]:
+    data = await storage.get(alternates_segment_key(key, segment))
+
+    with np.load(io.BytesIO(data)) as arrays:
+        return [arrays[f"arr_{i}"] for i in range(len(arrays.files))]
+
+
+async def delete_alternates_segments(key: str, count: int):
+    await asyncio.gather(
+        *[storage.delete(alternates_segment_key(key, i)) for i in range(count)]
+    )
+
+
+async def discard_checkpoint(key: str, checkpoint: dict):
+    """Abort the upload and delete the alternates segments of ``checkpoint``."""
+    try:
+        if checkpoint.get("upload_id"):
+            await asyncio.to_thread(
+                client.abort_multipart_upload,
+                Bucket=settings.aws_storage_bucket_name,
+                Key=key,
+                UploadId=checkpoint["upload_id"],
+            )
+
+        await delete_alternates_segments(key, checkpoint.get("segments", 0))
+    except ClientError:
+        logger.warning("could not discard checkpoint of %s", key, exc_info=True)
+
+
+async def match_stream(
+    chunks: Generator[pd.DataFrame, None, None],
+    query_key,
+    master_index: MasterIndex,
+    index_path: str,
+    upload: MultipartUpload,
+    score_cutoff: int = 0,
+    top_k: int = 1,
+    engine: str = "fuzz",
+    progress: dict | None = None,
+    checkpoint: Callable[[dict], Awaitable[None]] | None = None,
+    report: Callable[[int], Awaitable[None]] | None = None,
+) -> tuple[dict, dict, list]:
+    """Match ``chunks`` of the query file one at a time and write each result
+    chunk to ``upload``, so memory stays bounded by the chunk size.
+
+    Only distinct query values are scored; scores are remembered across
+    chunks (up to ``match_memo_size`` values) and broadcast back to row
+    order. Values equal to a master value or its normalized key are resolved
+    by hash lookup and only the rest go to the fuzzy engine.
+
+    ``progress`` continues the counters of an interrupted run. Whenever all
+    output so far has been uploaded as parts, the counters and upload state
+    are passed to ``checkpoint``; alternates up to that point are stored as
+    a numbered segment next to the result. ``report`` is called with the
+    rows processed after every chunk.
+
+    Returns the statistics, the final counters and, with ``top_k`` > 1, the
+    alternates since the last segment.
+    """
+    progress = {
+        "rows": 0,
+        "scored_rows": 0,
+        "hits": [0] * (FUZZY + 1),
+        "stats": {},
+        "segments": 0,
+        **(progress or {}),
+    }
+    stats = progress["stats"] = dict(progress["stats"])
+    alternates = []
+    memo = {}
+    hits = np.array(progress["hits"], dtype=np.int64)
+    first = not progress["rows"]
+    verify = first
+
+    try:
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            if not chunk.columns.isin([query_key]).any():
+                raise KeyError(f"query column {query_key!r} not found")
+
+            queries = await asyncio.to_thread(as_choices, chunk[query_key])
+            values, codes = await asyncio.to_thread(distinct, queries)
+            pending = [x for x in values if x not in memo]
+            # The first lookup also builds the hash maps of the master.
+            scored, remaining = await asyncio.to_thread(
+                resolve_keys, pending, master_index, top_k
+            )
+
+            if remaining:
+                fuzzy_result, chunk_stats = await match_in_pool(
+                    remaining,
+                    index_path,
+                    chunk_size=settings.match_chunk_size,
+                    candidates=settings.match_candidates,
+                    rows_per_chunk=settings.match_rows_per_chunk,
+                    cutoff=score_cutoff,
+                    top_k=top_k,
+                    engine=engine,
+                )
+                scored.update(
+                    zip(remaining, zip(*fuzzy_result, [FUZZY] * len(remaining)))
+                )
+
+                for key, value in chunk_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+
+            *result, stage = (
+                np.array(column)[codes]
+                for column in zip(
+                    *[scored[x] if x in scored else memo[x] for x in values]
+                )
+            )
+            hits += np.bincount(stage, minlength=len(hits))
+
+            if top_k > 1:
+                alternates.append(result[3:])
+            progress["rows"] += len(queries)
+            progress["scored_rows"] += len(pending)
+            progress["hits"] = hits.tolist()
+
+            if len(memo) < settings.match_memo_size:
+                memo.update(scored)
+
+            if verify and settings.match_verify_rows:
+                await asyncio.to_thread(
+                    verify_matches,
+                    queries,
+                    master_index.choices,
+                    result[:3],
+                    settings.match_verify_rows,
+                    stage == NORMALIZED,
+                    score_cutoff,
+                )
+            verify = False
+
+            resulting_df = results_frame(chunk[query_key], master_index, result)
+            data = await asyncio.to_thread(
+                resulting_df.to_csv, index=False, header=first
+            )
+            await asyncio.to_thread(upload.write, data.encode())
+
+            first = False
+
+            if checkpoint and upload.upload_id and not upload.buffered:
+                if alternates:
+                    await save_alternates_segment(
+                        upload.key, progress["segments"], alternates
+                    )
+                    progress["segments"] += 1
+                    alternates = []
+
+                await checkpoint(progress | {"stats": dict(stats)} | upload.state)
+
+            if report:
+                await report(progress["rows"])
+
+        if first:
+            upload.write(
+                pd.DataFrame(columns=RESULT_COLUMNS).to_csv(index=False).encode()
+            )
+    finally:
+        chunks.close()
+
+    stats = dict(stats)
+    stats["dedup_ratio"] = (
+        progress["rows"] / progress["scored_rows"] if progress["scored_rows"] else None
+    )
+    stats["exact_hits"] = int(hits[EXACT])
+    stats["normalized_hits"] = int(hits[NORMALIZED])
+    stats["fuzzy_hits"] = int(hits[FUZZY])
+
+    return stats, progress, alternates
+
+
+async def map_data(task: Task):
+    """Run the map job described by a claimed ``task``."""
+    params = task.params
+    query_column = params["query_column"]
+    master_column = params["master_column"]
+    query_key = query_column if not query_column.isnumeric() else int(query_column)
+    master_key = master_column if not master_column.isnumeric() else int(master_column)
+
+    async with get_async_session() as session:
+        file = await session.scalar(select(File).where(File.id == task.file_id))
+        master_file = await session.scalar(
+            select(File).where(File.id == task.master_file_id)
+        )
+
+    async with get_async_session() as session:
+        # The master file may have been deleted while the task was queued.
+        master_index = master_file and await asyncio.to_thread(
+            index_cache.get, master_file, master_column, settings.match_ngram
+        )
+        master_df = (
+            await read_file(master_file, columns=[master_key])
+            if master_file and master_index is None
+            else None
+        )
+
+        if master_file is None or (
+            master_index is None and not master_df.columns.isin([master_key]).any()
+        ):
+            await session.scalar(
+                update(Task)
+                .where(Task.id == task.id)
+                .values(status="FAILED", ended=datetime.now())
+                .returning(Task)
+            )
+            await session.commit()
+
+            return
+
+        key = "result" + "/" + f"{file.id}_{file.file_name}"
+        versions = {
+            "file_modified": file.modified.isoformat(),
+            "master_modified": master_file.modified.isoformat(),
+        }
+        resume = task.checkpoint
+
+        if resume and any(resume.get(k) != v for k, v in versions.items()):
+            logger.info("discarding outdated checkpoint of task %s", task.id)
+            await discard_checkpoint(key, resume)
+            resume = None
+
+        upload = MultipartUpload(
+            client,
+            settings.aws_storage_bucket_name,
+            key,
+            upload_id=resume and resume["upload_id"],
+            parts=resume and resume["parts"],
+        )
+
+        saved = dict(resume or {})
+
+        async def save_checkpoint(state: dict):
+            saved.update(state)
+
+            async with get_async_session() as checkpoint_session:
+                await checkpoint_session.execute(
+                    update(Task)
+                    .where(Task.id == task.id)
+                    .values(checkpoint=state | versions, ended=Task.ended)
+                )
+                await checkpoint_session.commit()
+
+        if resume:
+            logger.info("resuming task %s after %d rows", task.id, resume["rows"])
+
+        stream = {}
+        reporter = jobs.ProgressReporter(task.id, resume["rows"] if resume else 0)
+
+        async def report(rows: int):
+            await reporter(
+                rows,
+                stream.get("read", 0) / stream["size"] if stream.get("size") else None,
+            )
+
+        try:
+            if master_index is None:
+                master_index = await asyncio.to_thread(
+                    MasterIndex.build, master_df[master_key], settings.match_ngram
+                )
+                del master_df
+
+            path = await asyncio.to_thread(
+                index_cache.pin, master_file, master_column, master_index
+            )
+
+            try:
+                stats, progress, alternates = await match_stream(
+                    iter_file(
+                        file,
+                        settings.match_stream_rows,
+                        skip=resume["rows"] if resume else 0,
+                        stream=stream,
+                    ),
+                    query_key,
+                    master_index,
+                    path,
+                    upload,
+                    params["score_cutoff"],
+                    params["top_k"],
+                    params["engine"],
+                    progress=resume,
+                    checkpoint=save_checkpoint,
+                    report=report,
+                )
+            finally:
+                index_cache.unpin(path)
+
+            # Alternates of an earlier job on this file must not be attached
+            # to the new result, whether or not this job produces any.
+            await storage.delete(alternates_key(key))
+            await asyncio.to_thread(upload.complete)
+            await write_result_sidecar(key)
+
+            if progress["segments"]:
+                alternates[:0] = await asyncio.gather(
+                    *[
+                        load_alternates_segment(key, i)
+                        for i in range(progress["segments"])
+                    ]
+                )
+
+            if alternates:
+                data = await asyncio.to_thread(
+                    pack_alternates,
+                    master_index,
+                    *(np.concatenate(x) for x in zip(*alternates)),
+                )
+                await storage.put(alternates_key(key), data)
+                await delete_alternates_segments(key, progress["segments"])
+        except asyncio.CancelledError:
+            if await jobs.is_cancelled(task.id):
+                logger.info("map task %s cancelled", task.id)
+
+                await discard_checkpoint(
+                    key,
+                    {
+                        "upload_id": upload.upload_id,
+                        "segments": saved.get("segments", 0),
+                    },
+                )
+                await session.execute(
+                    update(Task)
+                    .where(Task.id == task.id)
+                    .values(checkpoint=None, ended=Task.ended)
+                )
+                await session.commit()
+
+            raise
+        except Exception as error:
+            if is_transient(error) and task.attempts < settings.worker_max_attempts:
+                logger.exception("map task %s failed, retrying", task.id)
+
+                await session.scalar(
+                    update(Task)
+                    .where(Task.id == task.id, Task.status == "IN_PROGRESS")
+                    .values(status="PENDING", worker_id=None, ended=Task.ended)
+                    .returning(Task)
+                )
+                await session.commit()
+
+                return
+
+            logger.exception("map task %s failed", task.id)
+
+            await discard_checkpoint(
+                key,
+                {"upload_id": upload.upload_id, "segments": saved.get("segments", 0)},
+            )
+            await session.scalar(
+                update(Task)
+                .where(Task.id == task.id, Task.status == "IN_PROGRESS")
+                .values(status="FAILED", ended=datetime.now(), checkpoint=None)
+                .returning(Task)
+            )
+            await session.commit()
+
+            return
+
+        result_file = await session.scalar(
+            insert(File)
+            .values(
+                file_name=f"{file.id}_{file.file_name}",
+                user_id=task.user_id,
+                description="",
+                unique=0,
+                valid=0,
+                total=0,
+                type="RESULT",
+            )
+            .returning(File)
+        )
+        # A task cancelled while its result was being published stays
+        # cancelled, and its result file row is not kept.
+        completed = await session.scalar(
+            update(Task)
+            .where(Task.id == task.id, Task.status == "IN_PROGRESS")
+            .values(
+                ended=datetime.now(),
+                status="COMPLETED",
+                file_id=result_file.id,
+                checkpoint=None,
+                rows_processed=progress["rows"],
+                rows_total=progress["rows"],
+                eta=None,
+                **stats,
+            )
+            .returning(Task)
+        )
+
+        if completed is None:
+            logger.info("map task %s was cancelled before completing", task.id)
+            await session.rollback()
+
+            return
+
+        await session.commit()
@@ -0,0 +1,992 @@
+import io
+import json
+import logging
+import math
+import os
+import unicodedata
+from collections.abc import Sequence
+from functools import cached_property
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+from scipy import sparse
+from thefuzz import fuzz as thefuzz
+
+logger = logging.getLogger("matching")
+
+RESULT_COLUMNS = ["source", "destination", "partial", "full"]
+
+# Stage that resolved a query value, see resolve_keys().
+EXACT, NORMALIZED, FUZZY = range(3)
+
+# Candidates per query for the tfidf engine when none are configured.
+TFIDF_CANDIDATES = 64
+
+
+class MatchVerificationError(ValueError): ...
+
+
+def as_choices(values: pd.Series) -> list[str | None]:
+    return [None if pd.isna(x) else str(x) for x in values]
+
+
+def distinct(values: list) -> tuple[list, np.ndarray]:
+    """Return the distinct ``values`` in first-seen order and the position of
+    each value in that list, so ``uniques[codes]`` rebuilds ``values``."""
+    positions = {}
+    codes = np.fromiter(
+        (positions.setdefault(x, len(positions)) for x in values),
+        dtype=np.int64,
+        count=len(values),
+    )
+
+    return list(positions), codes
+
+
+def normalize(value: str) -> str:
+    """Casefold and NFKC-normalize ``value``, turn punctuation and symbols
+    into spaces and collapse runs of whitespace."""
+    value = unicodedata.normalize("NFKC", value).casefold()
+
+    return " ".join(
+        "".join(
+            " " if unicodedata.category(x)[0] in "PSZ" else x for x in value
+        ).split()
+    )
+
+
+def ngrams(value: str, n: int = 3) -> set[str]:
+    padded = f" {normalize(value)} "
+
+    return {padded[i : i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def _pack_strings(values: list[str | None]) -> dict[str, np.ndarray]:
+    encoded = [b"" if x is None else x.encode("utf-8") for x in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(x) for x in encoded])
+
+    return {
+        "blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "offsets": offsets,
+        "missing": np.fromiter(
+            (x is None for x in values), dtype=bool, count=len(values)
+        ),
+    }
+
+
+def _unpack_strings(
+    blob: np.ndarray, offsets: np.ndarray, missing: np.ndarray
+) -> list[str | None]:
+    data = blob.tobytes()
+
+    return [
+        None if missing[i] else data[offsets[i] : offsets[i + 1]].decode("utf-8")
+        for i in range(len(missing))
+    ]
+
+
+class PackedStrings(Sequence):
+    """Read-only sequence of strings stored as a UTF-8 ``blob`` with
+    ``offsets``, as written by :func:`_pack_strings`.
+
+    Values are decoded on access, so memory-mapped arrays are shared between
+    processes instead of every process holding its own copy of the strings.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, missing: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self.missing = missing
+
+    def __len__(self) -> int:
+        return len(self.missing)
+
+    def _decode(self, start: int, stop: int) -> list[str | None]:
+        data = self.blob[self.offsets[start] : self.offsets[stop]].tobytes()
+        offsets = self.offsets[start : stop + 1] - self.offsets[start]
+        missing = self.missing[start:stop]
+
+        return [
+            None if missing[i] else data[offsets[i] : offsets[i + 1]].decode("utf-8")
+            for i in range(stop - start)
+        ]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+
+            return self._decode(start, max(start, stop))
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        if self.missing[index]:
+            return None
+
+        return (
+            self.blob[self.offsets[index] : self.offsets[index + 1]]
+            .tobytes()
+            .decode("utf-8")
+        )
+
+    def __iter__(self):
+        for start in range(0, len(self), 16384):
+            yield from self._decode(start, min(start + 16384, len(self)))
+
+
+class Take(Sequence):
+    """``values`` reordered by ``positions`` without copying them."""
+
+    def __init__(self, values: Sequence, positions: np.ndarray):
+        self.values = values
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.values[i] for i in self.positions[index]]
+
+        return self.values[self.positions[index]]
+
+
+class NgramIndex:
+    """Inverted index from character n-grams to master positions.
+
+    Postings are kept in CSR form (``indptr``/``indices``) so the whole index
+    is a handful of flat arrays.
+    """
+
+    def __init__(
+        self,
+        n: int,
+        size: int,
+        grams: Sequence[str],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+    ):
+        self.n = n
+        self.size = size
+        self.grams = grams
+        self.indptr = indptr
+        self.indices = indices
+
+    @cached_property
+    def vocabulary(self) -> dict[str, int]:
+        return {gram: i for i, gram in enumerate(self.grams)}
+
+    @classmethod
+    def build(cls, choices: list[str | None], n: int = 3) -> "NgramIndex":
+        postings: dict[str, list[int]] = {}
+
+        for i, value in enumerate(choices):
+            if value is None:
+                continue
+
+            for gram in ngrams(value, n):
+                postings.setdefault(gram, []).append(i)
+
+        indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(x) for x in postings.values()])
+        indices = np.fromiter(
+            chain.from_iterable(postings.values()),
+            dtype=np.int32,
+            count=int(indptr[-1]),
+        )
+
+        return cls(n, len(choices), list(postings), indptr, indices)
+
+    def candidates(self, value: str, limit: int) -> np.ndarray:
+        """Return up to ``limit`` master positions sharing the most n-grams
+        with ``value``, in ascending order."""
+        ids = [
+            self.vocabulary[gram]
+            for gram in ngrams(value, self.n)
+            if gram in self.vocabulary
+        ]
+
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+
+        hits = np.concatenate(
+            [self.indices[self.indptr[i] : self.indptr[i + 1]] for i in ids]
+        )
+        counts = np.bincount(hits, minlength=self.size)
+        matched = np.flatnonzero(counts)
+
+        if len(matched) > limit:
+            top = np.argpartition(counts[matched], -limit)[-limit:]
+            matched = np.sort(matched[top])
+
+        return matched
+
+
+class MasterIndex:
+    """Everything the matcher precomputes for one master column.
+
+    Holds the raw values used for scoring, their normalized keys, the n-gram
+    postings and the value lengths sorted into buckets. :meth:`save` writes
+    each part as a flat ``.npy`` array so an index can be reloaded (or
+    memory-mapped) without touching the original file.
+    """
+
+    # Bump whenever the saved layout or the key normalization changes.
+    version = 2
+
+    def __init__(
+        self,
+        choices: list[str | None],
+        keys: list[str | None],
+        lengths: np.ndarray,
+        by_length: np.ndarray,
+        ngrams: NgramIndex,
+    ):
+        self.choices = choices
+        self.keys = keys
+        self.lengths = lengths
+        self.by_length = by_length
+        self.ngrams = ngrams
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    @cached_property
+    def choices_by_length(self) -> Sequence[str | None]:
+        if isinstance(self.choices, PackedStrings):
+            return Take(self.choices, self.by_length)
+
+        return [self.choices[i] for i in self.by_length]
+
+    @cached_property
+    def tfidf(self) -> tuple[sparse.csr_matrix, np.ndarray, float]:
+        """Vocabulary x master matrix of L2-normalized binary TF-IDF weights,
+        the per-gram idf and the idf of grams missing from the master.
+
+        The n-gram postings already are this matrix in CSR form, so only the
+        weights have to be computed.
+        """
+        postings = self.ngrams
+        df = np.diff(postings.indptr)
+        idf = (np.log((1 + len(self)) / (1 + df)) + 1).astype(np.float32)
+        weights = np.repeat(idf, df)
+        norms = np.sqrt(
+            np.bincount(postings.indices, weights=weights**2, minlength=len(self))
+        )
+        weights /= norms[postings.indices]
+        matrix = sparse.csr_matrix(
+            (weights, postings.indices, postings.indptr),
+            shape=(len(postings.indptr) - 1, len(self)),
+        )
+
+        return matrix, idf, float(np.log(1 + len(self)) + 1)
+
+    @cached_property
+    def exact(self) -> dict[str, int]:
+        positions = {}
+
+        for i, value in enumerate(self.choices):
+            if value is not None:
+                positions.setdefault(value, i)
+
+        return positions
+
+    @cached_property
+    def normalized(self) -> dict[str, int]:
+        positions = {}
+
+        for i, key in enumerate(self.keys):
+            if key:
+                positions.setdefault(key, i)
+
+        return positions
+
+    @classmethod
+    def build(cls, values: pd.Series, ngram: int = 3) -> "MasterIndex":
+        choices = as_choices(values)
+        keys = [None if x is None else normalize(x) for x in choices]
+        lengths = np.fromiter(
+            (0 if x is None else len(x) for x in choices),
+            dtype=np.int32,
+            count=len(choices),
+        )
+
+        return cls(
+            choices,
+            keys,
+            lengths,
+            np.argsort(lengths, kind="stable"),
+            NgramIndex.build(keys, ngram),
+        )
+
+    def save(self, path: str):
+        arrays = {
+            "lengths": self.lengths,
+            "by_length": self.by_length,
+            "ngram_indptr": self.ngrams.indptr,
+            "ngram_indices": self.ngrams.indices,
+        }
+
+        for name, values in [
+            ("choices", self.choices),
+            ("keys", self.keys),
+            ("vocabulary", self.ngrams.grams),
+        ]:
+            for part, array in _pack_strings(values).items():
+                arrays[f"{name}_{part}"] = array
+
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"ngram": self.ngrams.n, "size": len(self)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str | None = None) -> "MasterIndex":
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        def strings(name):
+            return PackedStrings(
+                array(f"{name}_blob"),
+                array(f"{name}_offsets"),
+                array(f"{name}_missing"),
+            )
+
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        return cls(
+            strings("choices"),
+            strings("keys"),
+            array("lengths"),
+            array("by_length"),
+            NgramIndex(
+                meta["ngram"],
+                meta["size"],
+                strings("vocabulary"),
+                array("ngram_indptr"),
+                array("ngram_indices"),
+            ),
+        )
+
+
+def _raw_cutoff(cutoff: int) -> float:
+    # thefuzz rounds to the nearest integer, so e.g. 89.5 still counts as 90.
+    return max(cutoff - 0.5, 0)
+
+
+def _scores(
+    queries: list[str], choices: list[str | None], scorer, cutoff: int = 0
+) -> np.ndarray:
+    """Score matrix rounded the same way thefuzz rounds (``int(round(x))``);
+    scores below ``cutoff`` are reported as 0."""
+    scores = process.cdist(
+        queries,
+        choices,
+        scorer=scorer,
+        dtype=np.float32,
+        score_cutoff=_raw_cutoff(cutoff),
+    )
+
+    return np.rint(scores).astype(np.uint8)
+
+
+def length_range(length: int, cutoff: int) -> tuple[int, float]:
+    """Master lengths that can reach ``cutoff`` with ``fuzz.ratio`` against a
+    query of ``length``.
+
+    ``ratio`` is at most ``200 * min(a, b) / (a + b)``, so values that are
+    too short or too long can be skipped without scoring them.
+    """
+    raw = _raw_cutoff(cutoff)
+
+    if not raw:
+        return 0, np.inf
+
+    return math.ceil(raw * length / (200 - raw)), math.floor(length * (200 - raw) / raw)
+
+
+def best_matches(
+    queries: list[str | None],
+    master: MasterIndex,
+    chunk_size: int = 64,
+    cutoff: int = 0,
+    block_size: int = 16384,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return ``(destination, partial, full)`` arrays for every query.
+
+    ``destination`` is the position of the first choice with the highest
+    ``partial_ratio``; ``partial`` and ``full`` are the row maxima of the two
+    scorers, matching what ``map_data`` used to compute with ``Series.apply``.
+    Scores below ``cutoff`` are reported as 0, and queries without a
+    ``partial_ratio`` above 0 are unmatched with destination -1.
+
+    ``partial_ratio`` is computed over master blocks in position order and a
+    query stops being scored once it reaches 100. ``ratio`` is computed per
+    query length against the length bucket that can still reach ``cutoff``.
+    """
+    destination = np.full(len(queries), -1, dtype=np.int64)
+    partial = np.zeros(len(queries), dtype=np.uint8)
+
+    if not len(master):
+        return destination, partial, np.zeros(len(queries), dtype=np.uint8)
+
+    texts = ["" if x is None else x for x in queries]
+    live = np.fromiter((x is not None for x in queries), dtype=bool, count=len(texts))
+
+    for start in range(0, len(master), block_size):
+        rows = np.flatnonzero(live & (partial < 100))
+
+        if not len(rows):
+            break
+
+        block = master.choices[start : start + block_size]
+
+        for offset in range(0, len(rows), chunk_size):
+            chunk = rows[offset : offset + chunk_size]
+            scores = _scores(
+                [texts[i] for i in chunk], block, fuzz.partial_ratio, cutoff
+            )
+            best = scores.argmax(axis=1)
+            top = scores[np.arange(len(chunk)), best]
+            better = top > partial[chunk]
+
+            destination[chunk[better]] = start + best[better]
+            partial[chunk[better]] = top[better]
+
+    return destination, partial, best_ratios(queries, master, chunk_size, cutoff)
+
+
+def best_ratios(
+    queries: list[str | None],
+    master: MasterIndex,
+    chunk_size: int = 64,
+    cutoff: int = 0,
+    candidate_lists: list[np.ndarray] | None = None,
+) -> np.ndarray:
+    """Row maxima of ``ratio`` for every query, the ``full`` column of
+    :func:`best_matches`, limited to ``candidate_lists`` if given.
+
+    Only master values whose length can still reach ``cutoff`` are scored.
+    """
+    full = np.zeros(len(queries), dtype=np.uint8)
+
+    if candidate_lists is not None:
+        for i, (query, candidates) in enumerate(zip(queries, candidate_lists)):
+            if query is None or not len(candidates):
+                continue
+
+            low, high = length_range(len(query), cutoff)
+            lengths = master.lengths[candidates]
+            candidates = candidates[(lengths >= low) & (lengths <= high)]
+
+            if len(candidates):
+                full[i] = _scores(
+                    [query], [master.choices[j] for j in candidates], fuzz.ratio, cutoff
+                )[0].max()
+
+        return full
+
+    if not len(master):
+        return full
+
+    texts = ["" if x is None else x for x in queries]
+    live = np.fromiter((x is not None for x in queries), dtype=bool, count=len(texts))
+    lengths = np.fromiter((len(x) for x in texts), dtype=np.int64, count=len(texts))
+    sorted_lengths = master.lengths[master.by_length]
+
+    for length in np.unique(lengths[live]):
+        low, high = length_range(length, cutoff)
+        first = np.searchsorted(sorted_lengths, low, side="left")
+        last = np.searchsorted(sorted_lengths, high, side="right")
+
+        if first == last:
+            continue
+
+        bucket = master.choices_by_length[first:last]
+        rows = np.flatnonzero(live & (lengths == length))
+
+        for offset in range(0, len(rows), chunk_size):
+            chunk = rows[offset : offset + chunk_size]
+            scores = _scores([texts[i] for i in chunk], bucket, fuzz.ratio, cutoff)
+            full[chunk] = scores.max(axis=1)
+
+    return full
+
+
+def blocked_matches(
+    queries: list[str | None],
+    master: MasterIndex,
+    candidate_lists: list[np.ndarray],
+    cutoff: int = 0,
+) -> tuple[tuple[np.ndarray, np.ndarray, np.ndarray], int]:
+    """Like :func:`best_matches`, but each query is only scored against its
+    entry in ``candidate_lists`` (ascending master positions).
+
+    Queries without candidates, or without a score above 0, have
+    destination -1.
+
+    Returns the result arrays and the number of query/master pairs skipped.
+    """
+    destination = np.full(len(queries), -1, dtype=np.int64)
+    partial = np.zeros(len(queries), dtype=np.uint8)
+
+    for i, (query, candidates) in enumerate(zip(queries, candidate_lists)):
+        if not len(candidates):
+            continue
+
+        partial_scores = _scores(
+            [query], [master.choices[j] for j in candidates], fuzz.partial_ratio, cutoff
+        )[0]
+        partial[i] = partial_scores.max()
+
+        if partial[i]:
+            destination[i] = candidates[partial_scores.argmax()]
+
+    full = best_ratios(queries, master, cutoff=cutoff, candidate_lists=candidate_lists)
+
+    return (destination, partial, full), pruned_pairs(master, candidate_lists)
+
+
+def pruned_pairs(master: MasterIndex, candidate_lists: list[np.ndarray]) -> int:
+    """Number of query/master pairs that candidate blocking skips."""
+    return sum(len(master) - len(x) for x in candidate_lists)
+
+
+def tfidf_candidates(
+    queries: list[str | None],
+    master: MasterIndex,
+    limit: int,
+    chunk_size: int = 64,
+) -> list[np.ndarray]:
+    """Return the ``limit`` master positions with the highest TF-IDF cosine
+    similarity over character n-grams for each query, in ascending order.
+
+    Queries are vectorized against the master vocabulary and multiplied with
+    the master matrix ``chunk_size`` rows at a time.
+    """
+    matrix, idf, unseen = master.tfidf
+    candidate_lists = [np.empty(0, dtype=np.int64)] * len(queries)
+
+    for start in range(0, len(queries), chunk_size):
+        chunk = queries[start : start + chunk_size]
+        indptr = [0]
+        indices = []
+        data = []
+
+        for query in chunk:
+            grams = ngrams(query, master.ngrams.n) if query is not None else set()
+            ids = [
+                master.ngrams.vocabulary[x]
+                for x in grams
+                if x in master.ngrams.vocabulary
+            ]
+            weights = idf[ids]
+            norm = np.sqrt((weights**2).sum() + (len(grams) - len(ids)) * unseen**2)
+
+            indices.extend(ids)
+            data.extend(weights / norm if norm else weights)
+            indptr.append(len(indices))
+
+        vectors = sparse.csr_matrix(
+            (data, indices, indptr),
+            shape=(len(chunk), matrix.shape[0]),
+            dtype=np.float32,
+        )
+        similarity = (vectors @ matrix).tocsr()
+
+        for i in range(len(chunk)):
+            row = slice(similarity.indptr[i], similarity.indptr[i + 1])
+            positions = similarity.indices[row]
+
+            if len(positions) > limit:
+                top = np.argpartition(similarity.data[row], -limit)[-limit:]
+                positions = positions[top]
+
+            candidate_lists[start + i] = np.sort(positions).astype(np.int64)
+
+    return candidate_lists
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the ``k`` highest scores in each row, best first;
+    equal scores go to the lower column, as with ``argmax``.
+
+    Uses ``argpartition`` so only the selected ``k`` columns get sorted.
+    """
+    k = min(k, scores.shape[-1])
+    columns = scores.shape[-1]
+    # Unique keys that order by score, then by column, lowest first.
+    keys = scores.astype(np.int64) * columns + np.arange(columns - 1, -1, -1)
+    part = np.argpartition(keys, -k, axis=-1)[..., -k:]
+    order = np.argsort(-np.take_along_axis(keys, part, axis=-1), axis=-1)
+
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def top_matches(
+    queries: list[str | None],
+    master: MasterIndex,
+    k: int,
+    chunk_size: int = 64,
+    candidate_lists: list[np.ndarray] | None = None,
+    cutoff: int = 0,
+    block_size: int = 16384,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the ``k`` best master positions per query by ``partial_ratio``,
+    with their ``partial_ratio`` and ``ratio`` scores.
+
+    All three arrays are ``len(queries) x k``, best first. Empty slots have
+    position -1 and score 0. ``candidate_lists`` restricts each query to its
+    candidates, as in :func:`blocked_matches`.
+    """
+    top = np.full((len(queries), k), -1, dtype=np.int64)
+    top_partial = np.zeros((len(queries), k), dtype=np.uint8)
+    texts = ["" if x is None else x for x in queries]
+    live = np.fromiter((x is not None for x in queries), dtype=bool, count=len(texts))
+
+    if candidate_lists is not None:
+        for i in np.flatnonzero(live):
+            positions = candidate_lists[i]
+
+            if not len(positions):
+                continue
+
+            scores = _scores(
+                [texts[i]],
+                [master.choices[j] for j in positions],
+                fuzz.partial_ratio,
+                cutoff,
+            )[0]
+            selected = _top_k(scores, k)
+            top[i, : len(selected)] = positions[selected]
+            top_partial[i, : len(selected)] = scores[selected]
+    else:
+        for start in range(0, len(master), block_size):
+            # Rows whose k-th best is already 100 cannot improve any further.
+            rows = np.flatnonzero(live & (top_partial[:, -1] < 100))
+
+            if not len(rows):
+                break
+
+            block = master.choices[start : start + block_size]
+            positions = np.arange(start, start + len(block))
+
+            for offset in range(0, len(rows), chunk_size):
+                chunk = rows[offset : offset + chunk_size]
+                scores = np.concatenate(
+                    [
+                        top_partial[chunk],
+                        _scores(
+                            [texts[i] for i in chunk],
+                            block,
+                            fuzz.partial_ratio,
+                            cutoff,
+                        ),
+                    ],
+                    axis=1,
+                )
+                merged = np.concatenate(
+                    [top[chunk], np.broadcast_to(positions, (len(chunk), len(block)))],
+                    axis=1,
+                )
+                selected = _top_k(scores, k)
+                top[chunk] = np.take_along_axis(merged, selected, axis=1)
+                top_partial[chunk] = np.take_along_axis(scores, selected, axis=1)
+
+    top[top_partial == 0] = -1
+    top_full = np.zeros_like(top_partial)
+
+    for i, j in zip(*np.nonzero(top >= 0)):
+        top_full[i, j] = round(
+            fuzz.ratio(
+                texts[i],
+                master.choices[top[i, j]],
+                score_cutoff=_raw_cutoff(cutoff),
+            )
+        )
+
+    return top, top_partial, top_full
+
+
+def pack_alternates(
+    master: MasterIndex,
+    destination: np.ndarray,
+    partial: np.ndarray,
+    full: np.ndarray,
+) -> bytes:
+    """Serialize :func:`top_matches` output as a compressed ``.npz``.
+
+    Positions are remapped to a table of just the master values they use, so
+    the file can be read back without the master index.
+    """
+    used, codes = np.unique(destination[destination >= 0], return_inverse=True)
+    local = np.full(destination.shape, -1, dtype=np.int32)
+    local[destination >= 0] = codes
+    values = _pack_strings([master.choices[i] for i in used])
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        destination=local,
+        partial=partial,
+        full=full,
+        **{f"values_{name}": array for name, array in values.items()},
+    )
+
+    return buffer.getvalue()
+
+
+def unpack_alternates(data: bytes) -> list[list[dict]]:
+    with np.load(io.BytesIO(data)) as arrays:
+        values = _unpack_strings(
+            arrays["values_blob"], arrays["values_offsets"], arrays["values_missing"]
+        )
+
+        return [
+            [
+                {"destination": values[d], "partial": int(p), "full": int(f)}
+                for d, p, f in zip(*row)
+                if d >= 0
+            ]
+            for row in zip(arrays["destination"], arrays["partial"], arrays["full"])
+        ]
+
+
+def best_matches_thefuzz(
+    queries: list[str | None], choices: list[str | None]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reference implementation using the original per-row thefuzz calls."""
+    destination = np.zeros(len(queries), dtype=np.int64)
+    partial = np.zeros(len(queries), dtype=np.uint8)
+    full = np.zeros(len(queries), dtype=np.uint8)
+    master = pd.Series(choices, dtype=object)
+
+    for i, row in enumerate(queries):
+        if row is None or master.empty:
+            continue
+
+        partial_scores = master.apply(
+            lambda x: thefuzz.partial_ratio(x, row) if x is not None else 0
+        )
+        full_scores = master.apply(
+            lambda x: thefuzz.ratio(x, row) if x is not None else 0
+        )
+
+        destination[i] = partial_scores.to_numpy().argmax()
+        partial[i] = partial_scores.max()
+        full[i] = full_scores.max()
+
+    return destination, partial, full
+
+
+def verify_matches(
+    queries: list[str | None],
+    choices: list[str | None],
+    result: tuple[np.ndarray, np.ndarray, np.ndarray],
+    rows: int,
+    skip: np.ndarray | None = None,
+    cutoff: int = 0,
+):
+    """Compare the first ``rows`` results with the thefuzz reference.
+
+    A destination counts as correct when it has the same ``partial_ratio`` as
+    the reference one, since ties may legitimately resolve differently.
+    Reference scores below ``cutoff`` are expected as 0 and rows flagged in
+    ``skip`` are ignored.
+    """
+    sample = queries[:rows]
+    _, expected_partial, expected_full = best_matches_thefuzz(sample, choices)
+    expected_partial[expected_partial < cutoff] = 0
+    expected_full[expected_full < cutoff] = 0
+    destination, partial, full = (x[: len(sample)] for x in result)
+    checked = np.ones(len(sample), dtype=bool) if skip is None else ~skip[:rows]
+    chosen = np.array(
+        [
+            thefuzz.partial_ratio(choices[i], query)
+            if i >= 0 and query is not None and choices[i] is not None
+            else 0
+            for i, query in zip(destination, sample)
+        ],
+        dtype=np.uint8,
+    )
+
+    for name, got, want, rows_checked in [
+        ("destination", chosen, expected_partial, checked & (expected_partial > 0)),
+        ("partial", partial, expected_partial, checked),
+        ("full", full, expected_full, checked),
+    ]:
+        mismatches = np.flatnonzero((got != want) & rows_checked)
+
+        if len(mismatches):
+            raise MatchVerificationError(
+                f"{name} differs from thefuzz on {len(mismatches)} of "
+                f"{len(sample)} rows (first at row {mismatches[0]})"
+            )
+
+    logger.info("verified %d rows against thefuzz", int(checked.sum()))
+
+
+def resolve_keys(
+    values: list[str | None], master: MasterIndex, top_k: int = 1
+) -> tuple[dict, list[str | None]]:
+    """Resolve ``values`` that equal a master value, or its normalized key,
+    without fuzzy scoring.
+
+    Returns ``{value: (destination, 100, 100, stage)}`` for the hits and the
+    list of values still to be scored. With ``top_k`` > 1 the hit is also
+    the only alternate, laid out like a :func:`top_matches` row.
+    """
+    resolved = {}
+    remaining = []
+
+    for value in values:
+        if value is not None and value in master.exact:
+            position, stage = master.exact[value], EXACT
+        elif value is not None and (key := normalize(value)) in master.normalized:
+            position, stage = master.normalized[key], NORMALIZED
+        else:
+            remaining.append(value)
+
+            continue
+
+        if top_k > 1:
+            alternates = np.full(top_k, -1, dtype=np.int64)
+            scores = np.zeros(top_k, dtype=np.uint8)
+            alternates[0], scores[0] = position, 100
+            resolved[value] = (position, 100, 100, alternates, scores, scores, stage)
+        else:
+            resolved[value] = (position, 100, 100, stage)
+
+    return resolved, remaining
+
+
+def match_values(
+    queries: list[str | None],
+    master: MasterIndex,
+    chunk_size: int = 64,
+    candidates: int = 0,
+    cutoff: int = 0,
+    top_k: int = 1,
+    engine: str = "fuzz",
+) -> tuple[tuple[np.ndarray, ...], dict]:
+    """Match ``queries`` against ``master``.
+
+    With ``candidates`` > 0 the master n-gram index limits scoring to that
+    many candidates per query row; higher values trade speed for recall.
+    The ``tfidf`` engine picks candidates by TF-IDF cosine similarity
+    instead (see :func:`tfidf_candidates`). Either way the candidates are
+    re-ranked with the fuzz scorers so ``partial``/``full`` keep their
+    meaning.
+
+    Scores below ``cutoff`` are reported as 0, which lets the matcher skip
+    master values that cannot reach it. With ``top_k`` > 1 the
+    :func:`top_matches` arrays are appended to the result.
+
+    Returns the result arrays and per-job statistics.
+    """
+    if engine == "tfidf":
+        candidate_lists = tfidf_candidates(
+            queries, master, candidates or TFIDF_CANDIDATES, chunk_size
+        )
+    elif 0 < candidates < len(master):
+        candidate_lists = [
+            master.ngrams.candidates(x, candidates)
+            if x is not None
+            else np.empty(0, dtype=np.int64)
+            for x in queries
+        ]
+    else:
+        candidate_lists = None
+
+    pruned = 0 if candidate_lists is None else pruned_pairs(master, candidate_lists)
+
+    if top_k > 1:
+        # The best alternate is the match, so partial_ratio is scored once.
+        alternates = top_matches(
+            queries, master, top_k, chunk_size, candidate_lists, cutoff
+        )
+        result = (
+            alternates[0][:, 0].copy(),
+            alternates[1][:, 0].copy(),
+            best_ratios(queries, master, chunk_size, cutoff, candidate_lists),
+            *alternates,
+        )
+    elif candidate_lists is not None:
+        result, _ = blocked_matches(queries, master, candidate_lists, cutoff)
+    else:
+        result = best_matches(queries, master, chunk_size, cutoff)
+
+    return result, {"candidates_pruned": pruned}
+
+
+_loaded: dict[str, MasterIndex] = {}
+
+
+def match_chunk(
+    path: str,
+    queries: list[str | None],
+    chunk_size: int,
+    candidates: int,
+    cutoff: int,
+    top_k: int,
+    engine: str,
+) -> tuple[tuple[np.ndarray, ...], dict]:
+    """Process pool entry point: :func:`match_values` against the index saved
+    at ``path``, memory-mapped once per worker process."""
+    if path not in _loaded:
+        _loaded.clear()
+        _loaded[path] = MasterIndex.load(path, mmap_mode="r")
+
+    return match_values(
+        queries, _loaded[path], chunk_size, candidates, cutoff, top_k, engine
+    )
+
+
+def results_frame(
+    query: pd.Series,
+    master: MasterIndex,
+    result: tuple[np.ndarray, ...],
+) -> pd.DataFrame:
+    destination, partial, full = result[:3]
+    # Only the matched values are decoded; unmatched rows have destination -1.
+    matched = np.empty(len(destination), dtype=object)
+    matched[:] = [master.choices[i] if i >= 0 else "" for i in destination]
+
+    return pd.DataFrame(
+        {
+            "source": query.to_numpy(),
+            "destination": matched,
+            "partial": partial,
+            "full": full,
+        },
+        columns=RESULT_COLUMNS,
+    )
+
+
+def match_columns(
+    query: pd.Series,
+    master: MasterIndex,
+    chunk_size: int = 64,
+    candidates: int = 0,
+    cutoff: int = 0,
+    verify_rows: int = 0,
+) -> tuple[pd.DataFrame, dict]:
+    """Match every ``query`` value against ``master`` in this process."""
+    queries = as_choices(query)
+    result, stats = match_values(queries, master, chunk_size, candidates, cutoff)
+
+    if verify_rows:
+        verify_matches(queries, master.choices, result, verify_rows, cutoff=cutoff)
+
+    return results_frame(query, master, result), stats
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger("object_cache")
+
+
+class ObjectCache:
+    """Size-bounded local copies of downloaded objects, validated by ETag.
+
+    Each entry is one file holding the ETag on its first line followed by
+    the object, so entries are replaced atomically. Reads refresh the file's
+    mtime, which orders eviction. Entries validated less than
+    ``fresh_seconds`` ago by this process are served without asking the
+    server.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, fresh_seconds: float = 0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.validated = {}
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+    def summary(self) -> dict:
+        """Counters since start with the share of reads served from disk."""
+        reads = sum(self.stats.values())
+        cached = self.stats["hits"] + self.stats["revalidated"]
+
+        return self.stats | {"hit_rate": cached / reads if reads else 0.0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def load(self, key: str) -> tuple[str, bytes] | None:
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                etag = f.readline().decode().rstrip("\n")
+                data = f.read()
+
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return etag, data
+
+    def fresh(self, key: str) -> bool:
+        return time.monotonic() - self.validated.get(key, -float("inf")) < (
+            self.fresh_seconds
+        )
+
+    def store(self, key: str, etag: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".", dir=self.directory)
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(etag.encode() + b"\n")
+                f.write(data)
+
+            os.replace(tmp, self._path(key))
+        except OSError:
+            logger.warning("could not cache %s", key, exc_info=True)
+
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+            return
+
+        self.validated[key] = time.monotonic()
+        self.evict()
+
+    def discard(self, key: str):
+        self.validated.pop(key, None)
+
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits."""
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            if not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total -= size
+            logger.info("evicted cached object %s", path)
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.matching import match_chunk
+
+settings = get_settings()
+logger = logging.getLogger("pool")
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.match_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info("started match pool with %d workers", _executor._max_workers)
+
+    return _executor
+
+
+def shutdown():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def match_in_pool(
+    queries: list[str | None],
+    index_path: str,
+    chunk_size: int,
+    candidates: int,
+    rows_per_chunk: int,
+    cutoff: int = 0,
+    top_k: int = 1,
+    engine: str = "fuzz",
+) -> tuple[tuple[np.ndarray, ...], dict]:
+    """Split ``queries`` into chunks of ``rows_per_chunk`` rows and match them
+    on the process pool against the master index saved at ``index_path``.
+
+    Only the query chunk is sent to each worker; the master is memory-mapped
+    from disk by the worker itself.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+
+    parts = await asyncio.gather(
+        *[
+            loop.run_in_executor(
+                executor,
+                match_chunk,
+                index_path,
+                queries[start : start + rows_per_chunk],
+                chunk_size,
+                candidates,
+                cutoff,
+                top_k,
+                engine,
+            )
+            for start in range(0, len(queries), rows_per_chunk)
+        ]
+    )
+
+    if not parts:
+        empty = np.zeros(0, dtype=np.uint8)
+
+        return (np.zeros(0, dtype=np.int64), empty, empty), {"candidates_pruned": 0}
+
+    result = tuple(np.concatenate(arrays) for arrays in zip(*[x for x, _ in parts]))
+    stats = {key: sum(x[key] for _, x in parts) for key in parts[0][1]}
+
+    return result, stats
@@ -0,0 +1,266 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    length = np.zeros(len(values), dtype=np.uint8)
+
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >> np.uint64(shift)
+        nonzero = high != 0
+        length[nonzero] += shift
+        values = np.where(nonzero, high, values)
+
+    return length + (values != 0)
+
+
+def as_text(values: pd.Series) -> pd.Series:
+    """``values`` as the text they were read from, so the same value compares
+    equal whichever type a file's parser gave it in each chunk, e.g. ``1``
+    and ``1.0`` in an integer column with missing values."""
+    if pd.api.types.is_float_dtype(values) and (values % 1 == 0).all():
+        values = values.astype("int64")
+
+    return values.astype(str)
+
+
+def hash_values(text: pd.Series) -> np.ndarray:
+    """64-bit hashes of the text of values, see :func:`as_text`."""
+    return pd.util.hash_pandas_object(text, index=False).to_numpy()
+
+
+def infer_type(values: pd.Series) -> str | None:
+    """Type of the non-null ``values`` of a chunk, or None if there are none."""
+    if values.empty:
+        return None
+
+    if pd.api.types.is_bool_dtype(values):
+        return "boolean"
+
+    if pd.api.types.is_integer_dtype(values):
+        return "integer"
+
+    if pd.api.types.is_float_dtype(values):
+        return "integer" if (values % 1 == 0).all() else "float"
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return "datetime"
+
+    return "string"
+
+
+def widen_type(a: str | None, b: str | None) -> str | None:
+    """Type that holds values of both ``a`` and ``b``."""
+    if a is None or a == b:
+        return b
+
+    if b is None:
+        return a
+
+    if {a, b} == {"integer", "float"}:
+        return "float"
+
+    return "string"
+
+
+class HyperLogLog:
+    """Distinct-count sketch with ``2 ** precision`` one-byte registers.
+
+    Sketches of the same precision merge by taking the register maximum, so
+    the distinct count of a union never needs the underlying values.
+    """
+
+    def __init__(self, precision: int = 14, registers: np.ndarray | None = None):
+        self.precision = precision
+        self.registers = (
+            np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+        )
+
+    def add_hashes(self, hashes: np.ndarray):
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        rank = (width + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, text: pd.Series):
+        self.add_hashes(hash_values(text))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(int)).sum()
+        zeros = int((self.registers == 0).sum())
+
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        registers = np.frombuffer(data, dtype=np.uint8).copy()
+
+        return cls(int(np.log2(len(registers))), registers)
+
+
+class SpaceSaving:
+    """Approximate most frequent values, keeping at most ``capacity`` counters.
+
+    Each chunk is summarized by its own ``capacity`` most frequent values and
+    merged into the running summary: a value missing from one summary is
+    counted as that summary's smallest counter, so counts are upper bounds
+    that overestimate by at most ``error``.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+
+    def floor(self) -> int:
+        if len(self.counts) < self.capacity:
+            return 0
+
+        return min(self.counts.values())
+
+    def add(self, text: pd.Series):
+        counts = text.value_counts()
+        floor = int(counts.iloc[self.capacity]) if len(counts) > self.capacity else 0
+        chunk = {str(k): int(v) for k, v in counts.iloc[: self.capacity].items()}
+        own = self.floor()
+        merged = {}
+        errors = {}
+
+        for value in self.counts.keys() | chunk.keys():
+            merged[value] = self.counts.get(value, own) + chunk.get(value, floor)
+            errors[value] = (self.errors[value] if value in self.counts else own) + (
+                0 if value in chunk else floor
+            )
+
+        top = sorted(merged, key=merged.get, reverse=True)[: self.capacity]
+        self.counts = {x: merged[x] for x in top}
+        self.errors = {x: errors[x] for x in top}
+
+    def top(self, k: int) -> list[dict]:
+        return [
+            {"value": x, "count": self.counts[x], "error": self.errors[x]}
+            for x in list(self.counts)[:k]
+        ]
+
+
+class ColumnProfile:
+    def __init__(self, precision: int = 14):
+        self.count = 0
+        self.nulls = 0
+        self.type = None
+        self.min_length = None
+        self.max_length = None
+        self.sketch = HyperLogLog(precision)
+        self.frequent = SpaceSaving()
+
+    def update(self, values: pd.Series):
+        present = values.dropna()
+        self.count += len(values)
+        self.nulls += len(values) - len(present)
+        self.type = widen_type(self.type, infer_type(present))
+
+        if present.empty:
+            return
+
+        text = as_text(present)
+        lengths = text.str.len()
+        shortest, longest = int(lengths.min()), int(lengths.max())
+
+        if self.min_length is None or shortest < self.min_length:
+            self.min_length = shortest
+
+        if self.max_length is None or longest > self.max_length:
+            self.max_length = longest
+
+        self.sketch.add(text)
+        self.frequent.add(text)
+
+    @property
+    def null_rate(self) -> float:
+        return self.nulls / self.count if self.count else 0.0
+
+
+class Profiler:
+    """Single-pass column statistics over the chunks of a file."""
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.columns: dict[object, ColumnProfile] = {}
+
+    def update(self, chunk: pd.DataFrame):
+        for name in chunk.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnProfile(self.precision)
+
+            self.columns[name].update(chunk[name])
+
+    @property
+    def total(self) -> int:
+        return sum(x.count for x in self.columns.values())
+
+    @property
+    def valid(self) -> int:
+        return sum(x.count - x.nulls for x in self.columns.values())
+
+    @property
+    def unique(self) -> int:
+        return count_sketches(self.sketches())
+
+    def sketches(self) -> dict[str, HyperLogLog]:
+        """Distinct-count sketch of every column, by column name."""
+        return {str(name): column.sketch for name, column in self.columns.items()}
+
+
+def merge_sketches(
+    into: dict[str, HyperLogLog], sketches: dict[str, HyperLogLog]
+) -> dict[str, HyperLogLog]:
+    """Merge ``sketches`` into the sketch of the same column in ``into``."""
+    for name, sketch in sketches.items():
+        if name in into:
+            into[name].merge(sketch)
+        else:
+            into[name] = HyperLogLog(sketch.precision, sketch.registers.copy())
+
+    return into
+
+
+def count_sketches(sketches: dict[str, HyperLogLog]) -> int:
+    """Sum of the per-column distinct counts, as ``File.unique`` holds."""
+    return sum(x.count() for x in sketches.values())
+
+
+def pack_sketches(sketches: dict[str, HyperLogLog]) -> bytes:
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        names=np.array(list(sketches), dtype=str),
+        registers=np.stack([x.registers for x in sketches.values()])
+        if sketches
+        else np.zeros((0, 0), dtype=np.uint8),
+    )
+
+    return buffer.getvalue()
+
+
+def unpack_sketches(data: bytes) -> dict[str, HyperLogLog]:
+    with np.load(io.BytesIO(data)) as arrays:
+        return {
+            str(name): HyperLogLog.from_bytes(registers.tobytes())
+            for name, registers in zip(arrays["names"], arrays["registers"])
+        }
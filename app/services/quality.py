@@ -0,0 +1,118 @@
+from datetime import date, datetime
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import DataQuality, File, FileSketch
+from app.services.profiling import (
+    HyperLogLog,
+    count_sketches,
+    merge_sketches,
+    pack_sketches,
+    unpack_sketches,
+)
+
+PROFILED = or_(File.type == "QUERY", File.type == "MASTER")
+
+
+def this_month() -> date:
+    return datetime.now().replace(day=1).date()
+
+
+def ratio(part: int, total: int) -> float:
+    return part / total if total else 0.0
+
+
+async def snapshot(session: AsyncSession):
+    """Recompute this month's data quality row from every file.
+
+    The sketches of columns with the same name are merged across files, so a
+    value repeated in that column of several files counts once; files
+    without sketches only contribute their own unique count.
+    """
+    sketched = select(FileSketch.file_id).where(FileSketch.file_id == File.id)
+    valid, master, query, unsketched = (
+        await session.execute(
+            select(
+                func.coalesce(func.sum(File.valid).filter(PROFILED), 0),
+                func.coalesce(func.sum(File.total).filter(File.type == "MASTER"), 0),
+                func.coalesce(func.sum(File.total).filter(File.type == "QUERY"), 0),
+                func.coalesce(
+                    func.sum(File.unique).filter(PROFILED, ~sketched.exists()), 0
+                ),
+            )
+        )
+    ).one()
+    sketches = await session.execute(
+        select(FileSketch.column, FileSketch.sketch)
+        .join(File, File.id == FileSketch.file_id)
+        .where(PROFILED)
+    )
+    merged = {}
+
+    for column, sketch in sketches:
+        merge_sketches(merged, {column: HyperLogLog.from_bytes(sketch)})
+
+    unique = count_sketches(merged) + unsketched
+    total = master + query
+    values = {
+        "overall_completeness": ratio(valid, total),
+        "overall_uniqueness": ratio(unique, total),
+        "total_query_records": query,
+        "total_master_records": master,
+        "valid_records": valid,
+        "unique_records": unique,
+        "sketch": pack_sketches(merged),
+    }
+
+    await session.execute(
+        postgresql.insert(DataQuality)
+        .values(date=this_month(), **values)
+        .on_conflict_do_update(index_elements=[DataQuality.date], set_=values)
+    )
+
+
+async def apply_delta(
+    session: AsyncSession,
+    file_type: str,
+    valid: int = 0,
+    total: int = 0,
+    unique: int = 0,
+    sketches: dict[str, HyperLogLog] | None = None,
+):
+    """Add the change of one file to this month's data quality row.
+
+    ``unique`` is the change of the unique count of files without sketches;
+    ``sketches`` are merged into the running sketches of their columns. A
+    sketch cannot forget values, so values of replaced or deleted files stay
+    counted until the next :func:`snapshot`. Without a row for this month,
+    the month starts with a snapshot, which already includes the change.
+    """
+    if file_type not in ("QUERY", "MASTER"):
+        return
+
+    row = await session.scalar(
+        select(DataQuality).where(DataQuality.date == this_month()).with_for_update()
+    )
+
+    if row is None or row.sketch is None:
+        await snapshot(session)
+
+        return
+
+    merged = unpack_sketches(row.sketch)
+    unsketched = row.unique_records - count_sketches(merged) + unique
+    merge_sketches(merged, sketches or {})
+
+    if file_type == "MASTER":
+        row.total_master_records += total
+    else:
+        row.total_query_records += total
+
+    records = row.total_master_records + row.total_query_records
+    row.valid_records += valid
+    row.unique_records = count_sketches(merged) + unsketched
+    row.sketch = pack_sketches(merged)
+    row.overall_completeness = ratio(row.valid_records, records)
+    row.overall_uniqueness = ratio(row.unique_records, records)
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import logging
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+import requests
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError
+
+from app.models.file import File
+from app.services.bucket import file_key, storage
+
+logger = logging.getLogger("sidecar")
+
+# Sidecars live under their own prefix, so they never show up in the
+# version history of the object they belong to.
+SIDECAR_PREFIX = "sidecar/"
+SIDECAR = ".parquet"
+
+RESULT_TYPES = {
+    "source": pa.string(),
+    "destination": pa.string(),
+    "partial": pa.int16(),
+    "full": pa.int16(),
+}
+
+
+def sidecar_key(key: str) -> str:
+    """Key of the Parquet sidecar of the object at ``key``."""
+    return SIDECAR_PREFIX + key + SIDECAR
+
+
+def to_parquet(df: pd.DataFrame) -> bytes:
+    # Parquet column names are strings; fixed-width files have integer ones.
+    df = df.rename(columns=str)
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+
+    return buffer.getvalue()
+
+
+def is_fixed_width(file: File, is_csv=None) -> bool:
+    """Whether ``file`` is parsed as fixed-width text with integer column
+    names; results are CSV whatever their query file was named."""
+    return (
+        not is_csv and file.type.lower() != "result" and file.file_name.endswith(".txt")
+    )
+
+
+def parse_sidecar(
+    file: File, data: bytes, columns: list | None, is_csv=None
+) -> pd.DataFrame:
+    source = pa.BufferReader(data)
+
+    if columns is not None:
+        names = set(pq.read_schema(source).names)
+        columns = [str(x) for x in columns if str(x) in names]
+
+    df = pq.read_table(source, columns=columns).to_pandas()
+
+    if is_fixed_width(file, is_csv):
+        df = df.rename(columns=int)
+
+    return df
+
+
+async def write_sidecar(file: File, df: pd.DataFrame):
+    """Store ``df`` as the Parquet sidecar of ``file``; a frame pyarrow
+    cannot convert just leaves ``file`` without one."""
+    try:
+        data = await asyncio.to_thread(to_parquet, df)
+    except (pa.ArrowException, ValueError):
+        logger.warning("no parquet sidecar for %s", file.file_name, exc_info=True)
+        await storage.delete(sidecar_key(file_key(file)))
+
+        return
+
+    await storage.put(sidecar_key(file_key(file)), data)
+
+
+class SidecarSpool:
+    """Collect DataFrame chunks as Parquet parts on local disk and join them
+    into one sidecar whose schema fits every chunk, e.g. a column that is
+    integer in one chunk and has missing values in the next."""
+
+    def __init__(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.parts = []
+        self.failed = False
+
+    def write(self, chunk: pd.DataFrame):
+        if self.failed:
+            return
+
+        try:
+            table = pa.Table.from_pandas(
+                chunk.rename(columns=str), preserve_index=False
+            ).replace_schema_metadata()
+        except (pa.ArrowException, ValueError):
+            logger.warning("chunk cannot be stored as parquet", exc_info=True)
+            self.failed = True
+
+            return
+
+        path = os.path.join(self.directory.name, str(len(self.parts)))
+        pq.write_table(table, path)
+        self.parts.append((path, table.schema))
+
+    def finish(self) -> str | None:
+        """Return the path of the joined sidecar, or None if there is none."""
+        if self.failed or not self.parts:
+            return None
+
+        try:
+            schema = pa.unify_schemas(
+                [x for _, x in self.parts], promote_options="permissive"
+            )
+        except pa.ArrowException:
+            logger.warning("chunk schemas do not unify", exc_info=True)
+
+            return None
+
+        path = os.path.join(self.directory.name, "sidecar")
+
+        with pq.ParquetWriter(path, schema) as writer:
+            for part, _ in self.parts:
+                writer.write_table(pq.read_table(part).cast(schema))
+
+        return path
+
+    def close(self):
+        self.directory.cleanup()
+
+
+def convert_result(key: str, path: str):
+    """Write the Parquet sidecar of the result CSV at ``key`` to ``path``,
+    streaming it so memory stays bounded."""
+    with requests.get(storage.url(key), stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        reader = pv.open_csv(
+            response.raw,
+            convert_options=pv.ConvertOptions(column_types=RESULT_TYPES),
+        )
+
+        with pq.ParquetWriter(path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+async def write_result_sidecar(key: str):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sidecar")
+
+        try:
+            await asyncio.to_thread(convert_result, key, path)
+            # Through storage, so the cached copy of the old sidecar is
+            # discarded.
+            await storage.upload(sidecar_key(key), path)
+        except (pa.ArrowException, OSError, ClientError, S3UploadFailedError):
+            logger.warning("no parquet sidecar for %s", key, exc_info=True)
+            await storage.delete(sidecar_key(key))
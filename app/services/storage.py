@@ -0,0 +1,248 @@
+import asyncio
+import io
+import logging
+import time
+
+import httpx
+
+from app.services.object_cache import ObjectCache
+
+logger = logging.getLogger("storage")
+
+
+class MultipartUpload:
+    """Write an object to S3 incrementally through a multipart upload.
+
+    Data is buffered until ``part_size`` bytes are available (S3 requires
+    every part but the last to be at least 5 MiB). Objects that never fill
+    a part are sent with a single ``put_object`` on :meth:`complete`.
+
+    An interrupted upload continues from the ``upload_id`` and ``parts`` of
+    its :attr:`state` taken while nothing was buffered.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        part_size: int = 8 * 1024**2,
+        upload_id: str | None = None,
+        parts: list | None = None,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.upload_id = upload_id
+        self.parts = list(parts or [])
+        self.buffer = io.BytesIO()
+
+    @property
+    def buffered(self) -> int:
+        return self.buffer.tell()
+
+    @property
+    def state(self) -> dict:
+        return {"upload_id": self.upload_id, "parts": list(self.parts)}
+
+    def write(self, data: bytes):
+        self.buffer.write(data)
+
+        if self.buffer.tell() >= self.part_size:
+            self._flush()
+
+    def _flush(self):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key
+            )["UploadId"]
+
+        part = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=len(self.parts) + 1,
+            Body=self.buffer.getvalue(),
+        )
+        self.parts.append({"ETag": part["ETag"], "PartNumber": len(self.parts) + 1})
+        self.buffer = io.BytesIO()
+
+    def complete(self):
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=self.buffer.getvalue()
+            )
+
+            return
+
+        if self.buffer.tell():
+            self._flush()
+
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+            self.upload_id = None
+
+
+class ObjectStorage:
+    """Asynchronous access to the objects of one bucket.
+
+    Downloads stream from presigned URLs over a pooled HTTP client; the other
+    calls run the boto3 ``client`` in a thread so they never block the event
+    loop. Missing objects raise ``FileNotFoundError``.
+
+    With a ``cache``, downloads are kept on local disk and revalidated with
+    ``If-None-Match``, so an unchanged object is not transferred again.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        max_connections: int = 20,
+        cache: ObjectCache | None = None,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.max_connections = max_connections
+        self.cache = cache
+        self._http: httpx.AsyncClient | None = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections),
+                timeout=httpx.Timeout(30.0, read=None),
+            )
+
+        return self._http
+
+    def url(self, key: str, version_id: str | None = None, expires: int = 3600) -> str:
+        params = {"Bucket": self.bucket, "Key": key}
+
+        if version_id:
+            params["VersionId"] = version_id
+
+        return self.client.generate_presigned_url(
+            "get_object", ExpiresIn=expires, Params=params
+        ).replace("s3.amazonaws.com/", "")
+
+    async def get(self, key: str) -> bytes:
+        if self.cache is None:
+            cached = None
+        else:
+            cached = await asyncio.to_thread(self.cache.load, key)
+
+            if cached is not None and self.cache.fresh(key):
+                self.cache.stats["hits"] += 1
+
+                return cached[1]
+
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = await self.http.get(self.url(key), headers=headers)
+
+        if response.status_code == 304 and cached:
+            self.cache.stats["revalidated"] += 1
+            self.cache.validated[key] = time.monotonic()
+
+            return cached[1]
+
+        if response.status_code == 404:
+            if self.cache is not None:
+                self.cache.discard(key)
+
+            raise FileNotFoundError(key)
+
+        response.raise_for_status()
+
+        if self.cache is not None:
+            self.cache.stats["misses"] += 1
+
+            if etag := response.headers.get("ETag"):
+                await asyncio.to_thread(self.cache.store, key, etag, response.content)
+
+        return response.content
+
+    async def get_range(self, key: str, start: int, end: int) -> tuple[bytes, bool]:
+        """Return bytes ``start`` to ``end`` (inclusive) of ``key`` and whether
+        they reach the end of the object."""
+        response = await self.http.get(
+            self.url(key), headers={"Range": f"bytes={start}-{end}"}
+        )
+
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+
+        if response.status_code == 416:
+            return b"", True
+
+        response.raise_for_status()
+
+        if response.status_code != 206:
+            return response.content[start : end + 1], end + 1 >= len(response.content)
+
+        size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+
+        return response.content, end + 1 >= size
+
+    async def put(self, key: str, data: bytes):
+        if self.cache is not None:
+            self.cache.discard(key)
+
+        await asyncio.to_thread(
+            self.client.put_object, Bucket=self.bucket, Key=key, Body=data
+        )
+
+    async def upload(self, key: str, path: str):
+        """Upload the local file at ``path``, in parts if it is large."""
+        if self.cache is not None:
+            self.cache.discard(key)
+
+        await asyncio.to_thread(self.client.upload_file, path, self.bucket, key)
+
+    async def delete(self, key: str, version_id: str | None = None):
+        if self.cache is not None:
+            self.cache.discard(key)
+
+        params = {"VersionId": version_id} if version_id else {}
+
+        await asyncio.to_thread(
+            self.client.delete_object, Bucket=self.bucket, Key=key, **params
+        )
+
+    async def copy(self, source_key: str, key: str, version_id: str | None = None):
+        source = {"Bucket": self.bucket, "Key": source_key}
+
+        if version_id:
+            source["VersionId"] = version_id
+
+        if self.cache is not None:
+            self.cache.discard(key)
+
+        await asyncio.to_thread(self.client.copy, source, self.bucket, key)
+
+    async def list_versions(self, prefix: str) -> list[dict]:
+        response = await asyncio.to_thread(
+            self.client.list_object_versions, Bucket=self.bucket, Prefix=prefix
+        )
+
+        return response.get("Versions", [])
+
+    async def close(self):
+        if self.cache is not None:
+            logger.info("object cache: %s", self.cache.summary())
+
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
@@ -0,0 +1,133 @@
+"""Standalone worker that runs queued map tasks.
+
+python -m app.worker
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.config import get_settings
+from app.db import get_async_session
+from app.models.task import Task
+from app.services import ingest, jobs, pool
+from app.services.bucket import storage
+from app.services.mapping import map_data
+
+settings = get_settings()
+logger = logging.getLogger("worker")
+
+
+async def run_task(task: Task):
+    try:
+        await map_data(task)
+    except asyncio.CancelledError:
+        async with get_async_session() as session:
+            await jobs.release(session, task.id)
+
+        logger.info("released task %s", task.id)
+
+        raise
+    except Exception:
+        logger.exception("map task %s failed", task.id)
+
+        # A task cancelled before the failure stays cancelled.
+        async with get_async_session() as session:
+            await session.execute(
+                update(Task)
+                .where(Task.id == task.id, Task.status == "IN_PROGRESS")
+                .values(status="FAILED", ended=datetime.now())
+            )
+            await session.commit()
+
+
+async def supervise(worker_id: str, task: Task):
+    """Run ``task`` with heartbeats, stopping it once it is cancelled."""
+    job = asyncio.create_task(run_task(task))
+    beat = asyncio.create_task(jobs.keep_alive(worker_id, task.id, job.cancel))
+
+    try:
+        await job
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise
+    finally:
+        beat.cancel()
+
+
+async def run(worker_id: str | None = None):
+    """Claim and run up to ``worker_jobs`` tasks at a time until cancelled,
+    ingesting uploaded files alongside."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("worker %s started", worker_id)
+    running = set()
+    ingesting = asyncio.create_task(ingest.run())
+
+    try:
+        while True:
+            if len(running) >= settings.worker_jobs:
+                _, running = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                continue
+
+            try:
+                async with get_async_session() as session:
+                    await jobs.requeue_stale(session)
+                    task = await jobs.claim(session, worker_id)
+            except Exception:
+                logger.exception("claiming a task failed")
+                task = None
+
+            if task is None:
+                await asyncio.sleep(settings.worker_poll_seconds)
+
+                continue
+
+            logger.info("worker %s claimed task %s", worker_id, task.id)
+            running.add(asyncio.create_task(supervise(worker_id, task)))
+    finally:
+        ingesting.cancel()
+
+        for supervisor in running:
+            supervisor.cancel()
+
+        await asyncio.gather(ingesting, *running, return_exceptions=True)
+
+
+async def serve():
+    """Run a worker until SIGINT or SIGTERM; the task in flight is released
+    back to the queue."""
+    loop = asyncio.get_running_loop()
+    worker = asyncio.create_task(run())
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.cancel)
+
+    try:
+        await worker
+    except asyncio.CancelledError:
+        logger.info("worker stopped")
+    finally:
+        await storage.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+
+    try:
+        asyncio.run(serve())
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
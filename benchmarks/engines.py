@@ -0,0 +1,67 @@
+"""Compare the fuzz and tfidf matching engines on synthetic data.
+
+python -m benchmarks.engines --master 20000 --queries 1000
+"""
+
+import argparse
+import random
+import string
+import time
+
+from app.services.matching import MasterIndex, match_values
+
+
+def noisy(value: str, rng: random.Random) -> str:
+    chars = list(value)
+    chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--master", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--candidates", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+        for _ in range(args.master // 5 or 1)
+    ]
+    master = [" ".join(rng.choices(words, k=3)) for _ in range(args.master)]
+    queries = [noisy(rng.choice(master), rng) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    index = MasterIndex.build(master, 3)
+    print(f"index: {time.perf_counter() - start:.2f}s")
+
+    results = {}
+
+    for engine, candidates in (
+        ("fuzz", 0),
+        ("fuzz", args.candidates),
+        ("tfidf", args.candidates),
+    ):
+        start = time.perf_counter()
+        results[engine, candidates], _ = match_values(
+            queries, index, candidates=candidates, engine=engine
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{engine:>5} candidates={candidates:<5} {elapsed:.2f}s"
+            f" ({len(queries) / elapsed:,.0f} rows/s)"
+        )
+
+    exact = results["fuzz", 0][1]
+
+    for key, (_, partial, _) in results.items():
+        print(
+            f"{key[0]:>5} candidates={key[1]:<5} agreement {(partial == exact).mean():.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
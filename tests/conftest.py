@@ -0,0 +1,17 @@
+import os
+
+# Settings the app reads at import; the tests do not reach these services.
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_DB": "mdm",
+    "POSTGRES_PASSWORD": "postgres",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_ACCESS_KEY": "testing",
+    "AWS_STORAGE_BUCKET_NAME": "bucket",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "SECRET": "testing",
+    "ORIGIN": "[]",
+}.items():
+    os.environ.setdefault(name, value)
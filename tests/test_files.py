@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.models.file import File
+from app.services.files import parse_file
+from app.services.matching import MasterIndex, results_frame
+
+
+def test_result_with_unmatched_row():
+    master = MasterIndex.build(pd.Series(["apple", "banana"]))
+    result = (
+        np.array([0, -1]),
+        np.array([100, 0], dtype=np.uint8),
+        np.array([100, 0], dtype=np.uint8),
+    )
+    data = results_frame(pd.Series(["apple", "zzz"]), master, result).to_csv(
+        index=False
+    )
+    file = File(type="RESULT", file_name="id_query.txt")
+
+    records = parse_file(file, data.encode(), is_csv=True).to_dict(orient="records")
+
+    assert records == [
+        {"source": "apple", "destination": "apple", "partial": 100, "full": 100},
+        {"source": "zzz", "destination": "", "partial": 0, "full": 0},
+    ]
+    # What the JSON responses of /tasks/{task_id}/data and /table require.
+    json.dumps(records, allow_nan=False)
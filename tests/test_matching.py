@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from app.services.matching import (
+    EXACT,
+    NORMALIZED,
+    MasterIndex,
+    best_matches,
+    best_matches_thefuzz,
+    blocked_matches,
+    match_values,
+    resolve_keys,
+)
+
+MASTER = [
+    "Acme Corporation",
+    "Globex Inc",
+    "Initech",
+    "Umbrella Corp",
+    "Stark Industries",
+    "Wayne Enterprises",
+    "Wonka Industries",
+    "Cyberdyne Systems",
+    "Soylent Corp",
+    "Tyrell Corporation",
+    None,
+    "Acme Corp",
+]
+QUERIES = [
+    "acme corporation",
+    "Globex Incorporated",
+    "Initech LLC",
+    "Umbrela Corp",
+    "Stark Ind.",
+    "Wayne Ent",
+    "Wonka",
+    "Cyberdine Systems",
+    "Soylent Green",
+    "Tyrel Corp",
+    "zzzz",
+    None,
+    "",
+]
+
+
+def master():
+    return MasterIndex.build(pd.Series(MASTER, dtype=object))
+
+
+def assert_matches_thefuzz(result, expected, cutoff=0):
+    destination, partial, full = result
+    expected_destination, expected_partial, expected_full = expected
+    expected_partial = np.where(expected_partial >= cutoff, expected_partial, 0)
+    expected_full = np.where(expected_full >= cutoff, expected_full, 0)
+    matched = expected_partial > 0
+
+    assert partial.tolist() == expected_partial.tolist()
+    assert full.tolist() == expected_full.tolist()
+    assert destination[matched].tolist() == expected_destination[matched].tolist()
+    assert (destination[~matched] == -1).all()
+
+
+def test_best_matches_against_thefuzz():
+    expected = best_matches_thefuzz(QUERIES, MASTER)
+
+    assert_matches_thefuzz(best_matches(QUERIES, master(), chunk_size=4), expected)
+
+
+def test_best_matches_across_blocks():
+    expected = best_matches_thefuzz(QUERIES, MASTER)
+    result = best_matches(QUERIES, master(), chunk_size=4, block_size=3)
+
+    assert_matches_thefuzz(result, expected)
+
+
+def test_best_matches_with_cutoff():
+    expected = best_matches_thefuzz(QUERIES, MASTER)
+
+    for cutoff in (50, 80):
+        result = best_matches(QUERIES, master(), cutoff=cutoff)
+
+        assert_matches_thefuzz(result, expected, cutoff)
+
+
+def test_blocked_matches_with_every_candidate():
+    index = master()
+    everything = [np.arange(len(MASTER))] * len(QUERIES)
+    everything[QUERIES.index(None)] = np.empty(0, dtype=np.int64)
+
+    result, pruned = blocked_matches(QUERIES, index, everything)
+
+    assert_matches_thefuzz(result, best_matches_thefuzz(QUERIES, MASTER))
+    assert pruned == len(MASTER)
+
+
+def test_blocked_matches_without_candidates():
+    (destination, partial, full), pruned = blocked_matches(
+        ["Initech"], master(), [np.empty(0, dtype=np.int64)]
+    )
+
+    assert (destination.tolist(), partial.tolist(), full.tolist()) == ([-1], [0], [0])
+    assert pruned == len(MASTER)
+
+
+def test_ngram_candidates():
+    index = master()
+    candidates = index.ngrams.candidates("acme corp", 2)
+
+    assert candidates.tolist() == [0, 11]
+    assert index.ngrams.candidates("acme corp", 100).tolist() == sorted(
+        index.ngrams.candidates("acme corp", 100).tolist()
+    )
+    assert len(index.ngrams.candidates("qqqq", 5)) == 0
+
+
+def test_ngram_blocking_keeps_the_best_match():
+    index = master()
+    queries = ["Initech LLC", "Cyberdine Systems", "Tyrel Corp"]
+    full, _ = match_values(queries, index)
+    blocked, stats = match_values(queries, index, candidates=3)
+
+    assert blocked[0].tolist() == full[0].tolist()
+    assert blocked[1].tolist() == full[1].tolist()
+    assert stats["candidates_pruned"] > 0
+
+
+def test_top_matches_start_with_the_match():
+    index = master()
+    best, _ = match_values(QUERIES, index)
+    top, _ = match_values(QUERIES, index, top_k=3)
+
+    for expected, actual in zip(best, top[:3]):
+        assert actual.tolist() == expected.tolist()
+
+    assert top[3].shape == (len(QUERIES), 3)
+    assert (top[3][:, 0] == best[0]).all()
+
+
+def test_resolve_keys():
+    resolved, remaining = resolve_keys(
+        ["Initech", "  initech ", "Initech LLC", None], master()
+    )
+
+    assert resolved == {
+        "Initech": (2, 100, 100, EXACT),
+        "  initech ": (2, 100, 100, NORMALIZED),
+    }
+    assert remaining == ["Initech LLC", None]
@@ -0,0 +1,98 @@
+import pandas as pd
+
+from app.services.profiling import (
+    HyperLogLog,
+    Profiler,
+    SpaceSaving,
+    count_sketches,
+    merge_sketches,
+    pack_sketches,
+    unpack_sketches,
+)
+
+
+def values(start, stop):
+    return pd.Series([f"value {i}" for i in range(start, stop)])
+
+
+def test_hyperloglog_count():
+    sketch = HyperLogLog()
+    sketch.add(values(0, 20000))
+
+    assert abs(sketch.count() - 20000) < 20000 * 0.02
+
+
+def test_hyperloglog_merge_is_union():
+    whole = HyperLogLog()
+    whole.add(values(0, 15000))
+    first = HyperLogLog()
+    first.add(values(0, 10000))
+    second = HyperLogLog()
+    second.add(values(5000, 15000))
+
+    assert (first.merge(second).registers == whole.registers).all()
+
+
+def test_hyperloglog_round_trip():
+    sketch = HyperLogLog(precision=10)
+    sketch.add(values(0, 100))
+    copy = HyperLogLog.from_bytes(sketch.to_bytes())
+
+    assert copy.precision == 10
+    assert copy.count() == sketch.count()
+
+
+def test_merge_sketches_by_column():
+    a = Profiler()
+    a.update(pd.DataFrame({"name": values(0, 1000), "code": values(0, 10)}))
+    b = Profiler()
+    b.update(pd.DataFrame({"name": values(500, 1500)}))
+
+    merged = merge_sketches(merge_sketches({}, a.sketches()), b.sketches())
+
+    assert set(merged) == {"name", "code"}
+    assert abs(merged["name"].count() - 1500) < 30
+    assert merged["code"].count() == a.sketches()["code"].count()
+    # Merging copies the first sketch, so a's own counts are unchanged.
+    assert abs(a.sketches()["name"].count() - 1000) < 20
+
+
+def test_pack_sketches_round_trip():
+    profiler = Profiler()
+    profiler.update(pd.DataFrame({"name": values(0, 300), "code": values(0, 30)}))
+    sketches = unpack_sketches(pack_sketches(profiler.sketches()))
+
+    assert set(sketches) == {"name", "code"}
+    assert count_sketches(sketches) == profiler.unique
+    assert unpack_sketches(pack_sketches({})) == {}
+
+
+def test_space_saving_exact_when_it_fits():
+    frequent = SpaceSaving(capacity=8)
+    frequent.add(pd.Series(["a", "a", "b", "c"]))
+    frequent.add(pd.Series(["a", "b", "d"]))
+
+    assert frequent.top(2) == [
+        {"value": "a", "count": 3, "error": 0},
+        {"value": "b", "count": 2, "error": 0},
+    ]
+
+
+def test_space_saving_bounds_heavy_hitters():
+    chunks = [
+        pd.Series(["hot"] * 50 + ["warm"] * 20 + [f"cold {i}" for i in range(100)]),
+        pd.Series(
+            ["hot"] * 30 + ["warm"] * 25 + [f"cold {i}" for i in range(100, 200)]
+        ),
+    ]
+    frequent = SpaceSaving(capacity=4)
+
+    for chunk in chunks:
+        frequent.add(chunk)
+
+    top = {x["value"]: x for x in frequent.top(2)}
+
+    assert list(top) == ["hot", "warm"]
+
+    for value, true in (("hot", 80), ("warm", 45)):
+        assert top[value]["count"] - top[value]["error"] <= true <= top[value]["count"]
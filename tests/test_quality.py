@@ -0,0 +1,79 @@
+import asyncio
+
+import pandas as pd
+
+from app.models.file import DataQuality
+from app.services import quality
+from app.services.profiling import Profiler, pack_sketches
+
+
+class Session:
+    """Returns ``row`` for the locked read of this month's row."""
+
+    def __init__(self, row):
+        self.row = row
+
+    async def scalar(self, statement):
+        return self.row
+
+
+def sketch(start, stop):
+    profiler = Profiler()
+    profiler.update(pd.DataFrame({"name": [f"value {i}" for i in range(start, stop)]}))
+
+    return profiler.sketches()
+
+
+def month(unique_records=0, sketches=None):
+    return DataQuality(
+        date=quality.this_month(),
+        overall_uniqueness=0.0,
+        overall_completeness=0.0,
+        total_query_records=0,
+        total_master_records=0,
+        valid_records=0,
+        unique_records=unique_records,
+        sketch=pack_sketches(sketches or {}),
+    )
+
+
+def test_apply_delta_merges_sketches():
+    row = month()
+
+    async def test():
+        await quality.apply_delta(
+            Session(row), "QUERY", valid=900, total=1000, sketches=sketch(0, 1000)
+        )
+        await quality.apply_delta(
+            Session(row), "MASTER", valid=1000, total=1000, sketches=sketch(500, 1500)
+        )
+
+    asyncio.run(test())
+
+    assert row.total_query_records == 1000
+    assert row.total_master_records == 1000
+    assert row.valid_records == 1900
+    assert abs(row.unique_records - 1500) < 30
+    assert row.overall_completeness == 1900 / 2000
+    assert row.overall_uniqueness == row.unique_records / 2000
+
+
+def test_apply_delta_adjusts_unsketched_counts():
+    # 40 unique values of files without sketches, plus the sketched ones.
+    sketches = sketch(0, 1000)
+    row = month(unique_records=sketches["name"].count() + 40, sketches=sketches)
+    row.total_query_records = 1100
+
+    asyncio.run(quality.apply_delta(Session(row), "QUERY", total=-100, unique=-40))
+
+    assert row.unique_records == sketches["name"].count()
+    assert row.total_query_records == 1000
+
+
+def test_apply_delta_ignores_results():
+    row = month()
+
+    asyncio.run(quality.apply_delta(Session(row), "RESULT", valid=10, total=10))
+
+    assert row.valid_records == 0
+    assert row.total_query_records == 0
@@ -0,0 +1,128 @@
+import asyncio
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+
+from app.services.storage import ObjectStorage
+
+BUCKET = "bucket"
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+
+    yield f"http://{host}:{port}"
+
+    server.stop()
+
+
+@pytest.fixture
+def client(endpoint):
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    client.create_bucket(Bucket=BUCKET)
+    client.put_bucket_versioning(
+        Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"}
+    )
+
+    yield client
+
+    for version in client.list_object_versions(Bucket=BUCKET).get("Versions", []):
+        client.delete_object(
+            Bucket=BUCKET, Key=version["Key"], VersionId=version["VersionId"]
+        )
+
+    for marker in client.list_object_versions(Bucket=BUCKET).get("DeleteMarkers", []):
+        client.delete_object(
+            Bucket=BUCKET, Key=marker["Key"], VersionId=marker["VersionId"]
+        )
+
+    client.delete_bucket(Bucket=BUCKET)
+
+
+def run(client, test):
+    async def main():
+        storage = ObjectStorage(client, BUCKET)
+
+        try:
+            return await test(storage)
+        finally:
+            await storage.close()
+
+    return asyncio.run(main())
+
+
+def test_put_and_get(client):
+    async def test(storage):
+        await storage.put("Query/a.csv", b"name\nann\n")
+
+        return await storage.get("Query/a.csv")
+
+    assert run(client, test) == b"name\nann\n"
+
+
+def test_get_missing(client):
+    async def test(storage):
+        await storage.get("Query/missing.csv")
+
+    with pytest.raises(FileNotFoundError):
+        run(client, test)
+
+
+def test_get_range(client):
+    async def test(storage):
+        await storage.put("Query/a.csv", b"0123456789")
+
+        return (
+            await storage.get_range("Query/a.csv", 0, 3),
+            await storage.get_range("Query/a.csv", 6, 100),
+            await storage.get_range("Query/a.csv", 20, 30),
+        )
+
+    assert run(client, test) == ((b"0123", False), (b"6789", True), (b"", True))
+
+
+def test_delete(client):
+    async def test(storage):
+        await storage.put("Query/a.csv", b"data")
+        await storage.delete("Query/a.csv")
+        await storage.get("Query/a.csv")
+
+    with pytest.raises(FileNotFoundError):
+        run(client, test)
+
+
+def test_copy(client):
+    async def test(storage):
+        await storage.put("result/a.csv", b"first")
+        await storage.put("result/a.csv", b"second")
+        first = (await storage.list_versions("result/a.csv"))[-1]["VersionId"]
+        await storage.copy("result/a.csv", "result/b.csv")
+        await storage.copy("result/a.csv", "result/c.csv", first)
+
+        return await storage.get("result/b.csv"), await storage.get("result/c.csv")
+
+    assert run(client, test) == (b"second", b"first")
+
+
+def test_list_versions(client):
+    async def test(storage):
+        await storage.put("result/a.csv", b"first")
+        await storage.put("result/a.csv", b"second")
+        await storage.put("result/other.csv", b"other")
+
+        return await storage.list_versions("result/a.csv")
+
+    versions = run(client, test)
+
+    assert [x["Key"] for x in versions] == ["result/a.csv", "result/a.csv"]
+    assert [x["IsLatest"] for x in versions] == [True, False]